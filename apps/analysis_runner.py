@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Exécution concurrente des analyses indépendantes du POC Spark Failover
+Chaque analyse est soumise depuis un thread du driver, dans son propre pool du scheduler FAIR
+"""
+
+import os
+import logging
+import threading
+from concurrent.futures import FIRST_EXCEPTION, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from xml.sax.saxutils import quoteattr
+
+from pyspark.sql import SparkSession
+
+logger = logging.getLogger(__name__)
+
+JOB_GROUP_PREFIX = "analysis-"
+
+
+def parse_weights(spec: str) -> Dict[str, int]:
+    """Parser 'pool=poids,pool=poids'"""
+    weights = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        pool, _, weight = item.partition('=')
+        weights[pool.strip()] = int(weight or 1)
+    return weights
+
+
+class AnalysisCancelled(Exception):
+    """Analyses annulées par un arrêt du job"""
+
+
+class AnalysisRunner:
+    """Soumet des analyses en parallèle; la première erreur annule les autres et est relancée"""
+
+    def __init__(self,
+                 max_workers: int = 2,
+                 weights: Optional[Dict[str, int]] = None,
+                 min_share: int = 0,
+                 allocation_file: str = "/data/checkpoints/fairscheduler.xml"):
+        self.max_workers = max_workers
+        self.weights = weights or {}
+        self.min_share = min_share
+        self.allocation_file = allocation_file
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.active_groups: Dict[str, SparkSession] = {}
+        self.cancelled = False
+
+    @classmethod
+    def from_env(cls, checkpoint_dir: str) -> 'AnalysisRunner':
+        return cls(
+            max_workers=int(os.getenv("ANALYSIS_CONCURRENCY", "2")),
+            weights=parse_weights(os.getenv("ANALYSIS_POOL_WEIGHTS", "category_analysis=1,customer_analysis=2")),
+            min_share=int(os.getenv("ANALYSIS_POOL_MIN_SHARE", "0")),
+            allocation_file=os.path.join(checkpoint_dir, "fairscheduler.xml")
+        )
+
+    @property
+    def concurrent(self) -> bool:
+        return self.max_workers > 1
+
+    def describe(self) -> str:
+        if not self.concurrent:
+            return "séquentielle"
+        return f"{self.max_workers} threads, pools FAIR {self.weights or 'par défaut'}"
+
+    def session_configs(self) -> Dict[str, str]:
+        """Configuration du scheduler FAIR, avec un fichier d'allocation généré depuis les poids"""
+        if not self.concurrent:
+            return {}
+        pools = '\n'.join(
+            f'  <pool name={quoteattr(name)}>\n'
+            f'    <schedulingMode>FIFO</schedulingMode>\n'
+            f'    <weight>{weight}</weight>\n'
+            f'    <minShare>{self.min_share}</minShare>\n'
+            f'  </pool>'
+            for name, weight in self.weights.items()
+        )
+        os.makedirs(os.path.dirname(self.allocation_file), exist_ok=True)
+        with open(self.allocation_file, 'w') as f:
+            f.write(f'<?xml version="1.0"?>\n<allocations>\n{pools}\n</allocations>\n')
+        return {
+            "spark.scheduler.mode": "FAIR",
+            "spark.scheduler.allocation.file": self.allocation_file
+        }
+
+    def _call(self, spark: SparkSession, name: str, fn: Callable):
+        """Exécuter une analyse dans son pool et son groupe de jobs (propriétés locales au thread)"""
+        sc = spark.sparkContext
+        group = f"{JOB_GROUP_PREFIX}{name}"
+        with self.lock:
+            if self.cancelled:
+                raise AnalysisCancelled(f"Analyse {name} annulée avant son démarrage")
+            self.active_groups[group] = spark
+        sc.setJobGroup(group, f"Analyse {name}", interruptOnCancel=True)
+        sc.setLocalProperty("spark.scheduler.pool", name)
+        try:
+            return fn()
+        finally:
+            with self.lock:
+                self.active_groups.pop(group, None)
+            sc.setLocalProperty("spark.scheduler.pool", None)
+            sc.setLocalProperty("spark.jobGroup.id", None)
+            sc.setLocalProperty("spark.job.description", None)
+            sc.setLocalProperty("spark.job.interruptOnCancel", None)
+
+    def run(self, spark: SparkSession, tasks: Sequence[Tuple[str, Callable]]) -> List:
+        """Exécuter les analyses; retourne leurs résultats dans l'ordre des tâches"""
+        self.cancelled = False
+        if not self.concurrent:
+            return [self._call(spark, name, fn) for name, fn in tasks]
+
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis")
+        futures: List[Future] = [self.executor.submit(self._call, spark, name, fn) for name, fn in tasks]
+
+        done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+        failed = next((f for f in futures if f in done and f.exception() is not None), None)
+        if failed is not None:
+            # Ne pas laisser une écriture se poursuivre pendant la reprise
+            self.cancel()
+            wait(pending)
+            raise failed.exception()
+        return [f.result() for f in futures]
+
+    def cancel(self):
+        """Annuler les analyses en cours et celles en attente (appelable depuis un autre thread)"""
+        with self.lock:
+            self.cancelled = True
+            groups = dict(self.active_groups)
+        for group, spark in groups.items():
+            try:
+                spark.sparkContext.cancelJobGroup(group)
+                logger.info(f"⛔ Jobs du groupe {group} annulés")
+            except Exception as e:
+                logger.warning(f"⚠ Annulation du groupe {group} impossible: {e}")
+
+    def shutdown(self):
+        """Annuler et libérer le pool de threads sans attendre les analyses en cours"""
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark du pipeline failover (génération + traitement) sur une matrice de volumes
+Usage:
+    python benchmark.py run --rows 100000,1000000 --partitions 4,16 --formats csv,parquet \
+        --output bench.json [--baseline baseline.json]
+    python benchmark.py compare bench.json baseline.json [--threshold 0.10]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+import urllib.request
+from datetime import datetime
+from itertools import product
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("benchmark")
+
+
+def parse_list(value: str, cast=str) -> list:
+    return [cast(float(v)) if cast is int else cast(v) for v in value.split(',') if v.strip()]
+
+
+def jvm_peak_heap_mb(spark) -> Optional[float]:
+    """Pic d'utilisation du tas JVM du driver depuis le dernier reset"""
+    try:
+        pools = spark.sparkContext._jvm.java.lang.management.ManagementFactory.getMemoryPoolMXBeans()
+        peak = sum(p.getPeakUsage().getUsed() for p in pools if str(p.getType()) == 'Heap memory')
+        return round(peak / 1024 / 1024, 1)
+    except Exception:
+        return None
+
+
+def reset_jvm_peak(spark):
+    try:
+        for pool in spark.sparkContext._jvm.java.lang.management.ManagementFactory.getMemoryPoolMXBeans():
+            pool.resetPeakUsage()
+    except Exception:
+        pass
+
+
+def reset_python_peak() -> bool:
+    """Remettre à zéro le pic de RSS du processus (Linux: /proc/self/clear_refs)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def python_peak_rss_mb() -> Optional[float]:
+    """Pic de RSS du processus Python depuis le dernier reset (VmHWM), en MB"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def python_maxrss_mb() -> float:
+    """Pic de RSS du processus Python (driver PySpark) sur toute sa durée, en MB"""
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / 1024 / (1024 if sys.platform == 'darwin' else 1), 1)
+
+
+def shuffle_totals(spark) -> Dict[str, Optional[int]]:
+    """Octets de shuffle cumulés, lus via l'API REST de l'UI du driver"""
+    sc = spark.sparkContext
+    if not sc.uiWebUrl:
+        return {'shuffle_write_bytes': None, 'shuffle_read_bytes': None}
+    url = f"{sc.uiWebUrl}/api/v1/applications/{sc.applicationId}/stages?status=complete"
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            stages = json.load(response)
+    except Exception as e:
+        logger.warning(f"API REST Spark indisponible: {e}")
+        return {'shuffle_write_bytes': None, 'shuffle_read_bytes': None}
+    return {
+        'shuffle_write_bytes': sum(s.get('shuffleWriteBytes', 0) for s in stages),
+        'shuffle_read_bytes': sum(s.get('shuffleReadBytes', 0) for s in stages)
+    }
+
+
+def delta(after: Optional[int], before: Optional[int]) -> Optional[int]:
+    return None if after is None or before is None else after - before
+
+
+def run_case(job, rows: int, partitions: int, fmt: str, customers: int, data_dir: str) -> Dict:
+    """Exécuter un cycle complet (generate, category_analysis, customer_analysis)
+
+    `data_dir` est le répertoire créé par le harnais: il est vidé avant chaque cas
+    """
+    from data_generator import OrdersGenerator
+    from storage import StorageFormat
+    from checkpoint import RunManifest
+
+    shutil.rmtree(data_dir, ignore_errors=True)
+    job.generator = OrdersGenerator(rows=rows, customers=customers, partitions=partitions, seed=42)
+    job.storage = StorageFormat(fmt)
+    job.manifest = RunManifest(os.path.join(data_dir, "checkpoints", "run_manifest.json"))
+    job.spark.conf.set("spark.sql.shuffle.partitions", str(partitions))
+
+    shuffle_before = shuffle_totals(job.spark)
+    reset_jvm_peak(job.spark)
+    # ru_maxrss ne redescend jamais: seul un pic remis à zéro est propre au cas
+    python_peak_resettable = reset_python_peak()
+
+    start = time.perf_counter()
+    job.run_cycle()
+    wall = time.perf_counter() - start
+
+    shuffle_after = shuffle_totals(job.spark)
+    return {
+        'rows': rows,
+        'partitions': partitions,
+        'format': fmt,
+        'wall_s': round(wall, 3),
+        'rows_per_s': round(rows / wall, 1) if wall > 0 else None,
+        'stages': {name: dict(metrics) for name, metrics in job.stage_metrics.items()},
+        'driver_jvm_peak_heap_mb': jvm_peak_heap_mb(job.spark),
+        'driver_python_peak_rss_mb': python_peak_rss_mb() if python_peak_resettable else None,
+        'shuffle_write_bytes': delta(shuffle_after['shuffle_write_bytes'], shuffle_before['shuffle_write_bytes']),
+        'shuffle_read_bytes': delta(shuffle_after['shuffle_read_bytes'], shuffle_before['shuffle_read_bytes'])
+    }
+
+
+def run_matrix(args) -> Dict:
+    # Toujours un sous-répertoire créé ici: chaque cas le vide, jamais le --data-dir fourni
+    if args.data_dir:
+        os.makedirs(args.data_dir, exist_ok=True)
+    data_dir = tempfile.mkdtemp(prefix="failover-bench-", dir=args.data_dir)
+
+    # Rediriger les chemins du job avant son import
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["SPARK_MASTER_URL"] = args.master
+    os.environ["JOB_EVENTS_FILE"] = ""
+    from failover_job import SparkFailoverJob
+
+    job = SparkFailoverJob()
+    job.failure_rate = 0.0
+    if not job.create_spark_session():
+        raise RuntimeError("Impossible de créer la session Spark")
+
+    results = []
+    try:
+        for rows, partitions, fmt in product(args.rows, args.partitions, args.formats):
+            for repeat in range(args.warmup + args.repeat):
+                result = run_case(job, rows, partitions, fmt, args.customers, data_dir)
+                if repeat < args.warmup:
+                    continue
+                result['repeat'] = repeat - args.warmup
+                results.append(result)
+                logger.info(f"rows={rows} partitions={partitions} format={fmt} "
+                            f"#{result['repeat']}: {result['wall_s']}s, {result['rows_per_s']} lignes/s")
+        spark_version = job.spark.version
+    finally:
+        job.cleanup()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(),
+            'driver_python_maxrss_mb': python_maxrss_mb(),
+            'master': args.master,
+            'spark_version': spark_version,
+            'python': platform.python_version(),
+            'host': platform.node(),
+            'customers': args.customers,
+            'repeat': args.repeat,
+            'warmup': args.warmup
+        },
+        'results': results
+    }
+
+
+def summarize(report: Dict) -> Dict[tuple, float]:
+    """Débit médian par cas (rows, partitions, format)"""
+    cases: Dict[tuple, List[float]] = {}
+    for r in report['results']:
+        if r.get('rows_per_s'):
+            cases.setdefault((r['rows'], r['partitions'], r['format']), []).append(r['rows_per_s'])
+    return {case: statistics.median(values) for case, values in cases.items()}
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """Comparer les débits médians; une baisse au-delà du seuil est une régression"""
+    current_cases = summarize(current)
+    baseline_cases = summarize(baseline)
+    rows = []
+    for case in sorted(current_cases):
+        if case not in baseline_cases:
+            continue
+        now, before = current_cases[case], baseline_cases[case]
+        change = (now - before) / before
+        rows.append({
+            'rows': case[0], 'partitions': case[1], 'format': case[2],
+            'baseline_rows_per_s': before, 'rows_per_s': now,
+            'change': round(change, 4),
+            'regression': change < -threshold
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict]) -> bool:
+    regressions = False
+    for r in rows:
+        flag = '❌ RÉGRESSION' if r['regression'] else '✓'
+        regressions |= r['regression']
+        print(f"{flag} rows={r['rows']} partitions={r['partitions']} format={r['format']}: "
+              f"{r['baseline_rows_per_s']:.0f} -> {r['rows_per_s']:.0f} lignes/s ({r['change']:+.1%})")
+    if not rows:
+        print("Aucun cas commun avec la baseline")
+    return regressions
+
+
+def load(path: str) -> Dict:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline Spark Failover")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Exécuter la matrice de benchmark")
+    run.add_argument("--master", default="local[*]", help="local[*], local-cluster[2,1,1024], spark://...")
+    run.add_argument("--rows", type=lambda v: parse_list(v, int), default=[100000, 1000000])
+    run.add_argument("--partitions", type=lambda v: parse_list(v, int), default=[8])
+    run.add_argument("--formats", type=parse_list, default=["csv", "parquet"])
+    run.add_argument("--customers", type=int, default=10000)
+    run.add_argument("--repeat", type=int, default=3)
+    run.add_argument("--warmup", type=int, default=1)
+    run.add_argument("--data-dir", help="Répertoire parent du répertoire de travail temporaire")
+    run.add_argument("--output", default="bench.json")
+    run.add_argument("--baseline", help="Baseline JSON à comparer après l'exécution")
+    run.add_argument("--threshold", type=float, default=0.10, help="Baisse de débit tolérée (0.10 = 10%%)")
+
+    cmp_parser = sub.add_parser("compare", help="Comparer deux résultats")
+    cmp_parser.add_argument("current")
+    cmp_parser.add_argument("baseline")
+    cmp_parser.add_argument("--threshold", type=float, default=0.10)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    if args.command == "compare":
+        current = load(args.current)
+    else:
+        current = run_matrix(args)
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        logger.info(f"✓ Résultats écrits dans {args.output}")
+        if not args.baseline:
+            return 0
+
+    rows = compare(current, load(args.baseline), args.threshold)
+    return 1 if print_comparison(rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
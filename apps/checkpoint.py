@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Manifeste de run persistant pour la reprise du POC Spark Failover
+Enregistre les étapes committées d'un cycle pour reprendre à la première étape incomplète
+"""
+
+import os
+import json
+import uuid
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Étapes d'un cycle, dans l'ordre d'exécution
+STAGES = ('generate', 'category_analysis', 'customer_analysis')
+
+
+class RunManifest:
+    """Manifeste JSON écrit de façon atomique (fichier temporaire + os.replace)
+
+    Les analyses concurrentes committent depuis plusieurs threads: les écritures sont sérialisées
+    """
+
+    def __init__(self, path: str = "/data/checkpoints/run_manifest.json"):
+        self.path = path
+        self.lock = threading.RLock()
+        self.state = self._load()
+
+    def _load(self) -> Dict:
+        """Charger le manifeste existant; un manifeste illisible est ignoré"""
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+            if isinstance(state, dict) and 'stages' in state:
+                return state
+            logger.warning(f"Manifeste invalide ignoré: {self.path}")
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifeste illisible ignoré ({self.path}): {e}")
+        return {'cycle_id': None, 'stages': {}, 'completed': True}
+
+    def _save(self):
+        """Écrire le manifeste de façon atomique et durable"""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with self.lock:
+            with open(tmp_path, 'w') as f:
+                json.dump(self.state, f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    @property
+    def cycle_id(self) -> Optional[str]:
+        return self.state.get('cycle_id')
+
+    def in_progress(self) -> bool:
+        """Un cycle a-t-il été commencé sans être terminé ?"""
+        return not self.state.get('completed', True)
+
+    def begin_cycle(self) -> str:
+        """Démarrer un nouveau cycle"""
+        self.state = {
+            'cycle_id': uuid.uuid4().hex[:12],
+            'started_at': datetime.now().isoformat(),
+            'stages': {},
+            'completed': False
+        }
+        self._save()
+        return self.cycle_id
+
+    def is_committed(self, stage: str) -> bool:
+        return stage in self.state['stages']
+
+    def next_stage(self) -> Optional[str]:
+        """Première étape non committée du cycle courant"""
+        for stage in STAGES:
+            if not self.is_committed(stage):
+                return stage
+        return None
+
+    def commit(self, stage: str, metrics: Optional[Dict] = None):
+        """Marquer une étape comme committée"""
+        if stage not in STAGES:
+            raise ValueError(f"Étape inconnue: {stage}")
+        with self.lock:
+            self.state['stages'][stage] = {
+                'committed_at': datetime.now().isoformat(),
+                **(metrics or {})
+            }
+            self._save()
+
+    def complete_cycle(self):
+        """Clore le cycle courant"""
+        self.state['completed'] = True
+        self.state['completed_at'] = datetime.now().isoformat()
+        self._save()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Générateur distribué de commandes synthétiques pour le POC Spark Failover
+Les lignes sont produites sur les executors à partir de spark.range
+"""
+
+import os
+import random
+import logging
+from typing import Dict, Optional
+
+from pyspark.sql import SparkSession, DataFrame
+from pyspark.sql import functions as F
+from pyspark.sql.types import StructType, StructField, StringType, DoubleType, TimestampType
+
+logger = logging.getLogger(__name__)
+
+# Schéma typé des commandes (source de vérité pour l'écriture et la relecture)
+ORDERS_SCHEMA = StructType([
+    StructField("order_id", StringType(), False),
+    StructField("customer_id", StringType(), False),
+    StructField("product_category", StringType(), False),
+    StructField("amount", DoubleType(), False),
+    StructField("timestamp", TimestampType(), False)
+])
+
+DEFAULT_CATEGORIES = {'Electronics': 1.0, 'Clothing': 1.0, 'Books': 1.0, 'Home': 1.0}
+
+# rand(s) est initialisé par partition avec s + index de partition: des seeds de colonnes
+# consécutifs réutiliseraient les mêmes flux décalés d'une partition
+COLUMN_SEED_STRIDE = 1_000_003
+
+
+def parse_categories(spec: str) -> Dict[str, float]:
+    """Parser une distribution de catégories au format 'Nom:poids,Nom:poids'"""
+    categories = {}
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, weight = item.partition(':')
+        categories[name.strip()] = float(weight) if weight else 1.0
+
+    if not categories or any(w < 0 for w in categories.values()) or sum(categories.values()) <= 0:
+        raise ValueError(f"Distribution de catégories invalide: {spec!r}")
+    return categories
+
+
+class OrdersGenerator:
+    """Génère des commandes e-commerce sans jamais matérialiser les lignes sur le driver"""
+
+    def __init__(self,
+                 rows: int = 1000,
+                 customers: int = 100,
+                 categories: Optional[Dict[str, float]] = None,
+                 skew: float = 0.0,
+                 seed: Optional[int] = None,
+                 partitions: Optional[int] = None):
+        if rows < 0:
+            raise ValueError("rows doit être positif")
+        if customers < 1:
+            raise ValueError("customers doit être >= 1")
+        if skew < 0:
+            raise ValueError("skew doit être >= 0")
+
+        self.rows = rows
+        self.customers = customers
+        self.categories = categories or dict(DEFAULT_CATEGORIES)
+        self.skew = skew
+        self.seed = seed
+        self.partitions = partitions
+
+    @classmethod
+    def from_env(cls) -> 'OrdersGenerator':
+        """Construire le générateur à partir des variables d'environnement"""
+        seed = os.getenv("ORDERS_SEED")
+        partitions = os.getenv("ORDERS_PARTITIONS")
+        categories = os.getenv("ORDERS_CATEGORIES")
+        return cls(
+            rows=int(os.getenv("ORDERS_ROWS", "1000")),
+            customers=int(os.getenv("ORDERS_CUSTOMERS", "100")),
+            categories=parse_categories(categories) if categories else None,
+            skew=float(os.getenv("ORDERS_SKEW", "0")),
+            seed=int(seed) if seed else None,
+            partitions=int(partitions) if partitions else None
+        )
+
+    def _category_column(self, u):
+        """Tirer une catégorie selon la distribution cumulée des poids"""
+        total = sum(self.categories.values())
+        names = list(self.categories)
+        expr = None
+        cumulative = 0.0
+        for name in names[:-1]:
+            cumulative += self.categories[name] / total
+            expr = (F.when(u < cumulative, F.lit(name)) if expr is None
+                    else expr.when(u < cumulative, F.lit(name)))
+        last = F.lit(names[-1])
+        return last if expr is None else expr.otherwise(last)
+
+    def _customer_column(self, u):
+        """Tirer un client; skew > 0 concentre les commandes sur les premiers clients"""
+        index = F.floor(F.pow(u, F.lit(1.0 + self.skew)) * F.lit(self.customers)) + 1
+        index = F.least(index, F.lit(self.customers))
+        width = max(3, len(str(self.customers)))
+        return F.format_string(f"CUST_%0{width}d", index.cast("long"))
+
+    def build(self, spark: SparkSession) -> DataFrame:
+        """Construire le DataFrame de commandes (plan paresseux, exécuté sur les executors)"""
+        seed = self.seed if self.seed is not None else random.randrange(2 ** 31)
+        partitions = self.partitions or spark.sparkContext.defaultParallelism
+
+        logger.info(f"Génération distribuée: {self.rows} commandes, {self.customers} clients, "
+                    f"skew={self.skew}, seed={seed}, partitions={partitions}")
+
+        width = max(4, len(str(max(self.rows - 1, 0))))
+        base = spark.range(0, self.rows, 1, partitions)
+
+        df = base.select(
+            F.format_string(f"ORD_%0{width}d", F.col("id")).alias("order_id"),
+            self._customer_column(F.rand(seed)).alias("customer_id"),
+            self._category_column(F.rand(seed + COLUMN_SEED_STRIDE)).alias("product_category"),
+            F.round(F.lit(10.0) + F.rand(seed + 2 * COLUMN_SEED_STRIDE) * F.lit(490.0), 2).alias("amount"),
+            F.current_timestamp().alias("timestamp")
+        )
+
+        # Aligner les types sur le schéma déclaré
+        return df.select([
+            F.col(field.name).cast(field.dataType).alias(field.name)
+            for field in ORDERS_SCHEMA.fields
+        ])
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Canal d'événements structurés du job Spark Failover
+Chaque événement est une ligne JSON ajoutée à un fichier lu incrémentalement par le monitor
+Le fichier tourne par taille: le monitor ne relit au démarrage que le fichier courant
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from typing import Optional
+
+from log_pipeline import SizeAndTimeRotatingFileHandler
+
+logger = logging.getLogger(__name__)
+
+
+class EventEmitter:
+    """Écrit des événements JSONL en append-only; une erreur d'écriture n'interrompt jamais le job"""
+
+    def __init__(self, path: Optional[str] = "/logs/job_events.jsonl",
+                 max_bytes: int = 20 * 1024 * 1024, backup_count: int = 3):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.lock = threading.Lock()
+        self._file: Optional[SizeAndTimeRotatingFileHandler] = None
+
+    @classmethod
+    def from_env(cls) -> 'EventEmitter':
+        return cls(
+            os.getenv("JOB_EVENTS_FILE", "/logs/job_events.jsonl") or None,
+            max_bytes=int(float(os.getenv("JOB_EVENTS_MAX_MB", "20")) * 1024 * 1024),
+            backup_count=int(os.getenv("JOB_EVENTS_BACKUPS", "3"))
+        )
+
+    def _open(self) -> SizeAndTimeRotatingFileHandler:
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Même rotation que le log applicatif: job_events.jsonl.1, .2, ...
+            self._file = SizeAndTimeRotatingFileHandler(self.path, max_bytes=self.max_bytes,
+                                                        backup_count=self.backup_count)
+        return self._file
+
+    def emit(self, event: str, **fields):
+        """Émettre un événement horodaté"""
+        if not self.path:
+            return
+        record = {'ts': round(time.time(), 3), 'event': event, **fields}
+        line = json.dumps(record, separators=(',', ':'), default=str)
+        try:
+            with self.lock:
+                handler = self._open()
+                # Rotation avant l'écriture d'une ligne qui dépasserait la taille maximale
+                if handler.shouldRollover(logging.makeLogRecord({'msg': line})):
+                    handler.doRollover()
+                handler.stream.write(line + '\n')
+                handler.stream.flush()
+        except OSError as e:
+            logger.warning(f"⚠ Événement {event} non écrit: {e}")
+            self._file = None
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
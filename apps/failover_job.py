@@ -6,28 +6,48 @@ POC pour démonstration Docker Compose
 
 import os
 import time
-import random
 import logging
 import signal
 import sys
-from datetime import datetime
+from contextlib import contextmanager
 from typing import Optional
 
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, count, avg, max as spark_max
-from pyspark.sql.types import StructType, StructField, StringType, IntegerType, TimestampType
+from pyspark import StorageLevel
+from pyspark.sql import SparkSession, Observation
+from pyspark.sql.functions import col, count, lit, max as spark_max, sum as spark_sum
+
+from data_generator import OrdersGenerator, ORDERS_SCHEMA
+from storage import StorageFormat
+from checkpoint import RunManifest
+from streaming import StreamingAnalyses
+from failures import FailureKind, classify_failure
+from health import HealthProbe, executor_count
+from events import EventEmitter
+from faults import FaultInjector
+from scheduler import CycleScheduler, backoff_from_env
+from heavy_hitters import HeavyHitters
+from analysis_runner import AnalysisRunner
+from tuning import SessionTuner, directory_size
+from output_commit import VersionedOutput
+from log_pipeline import LogPipeline, start_logging
 
-# Configuration logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('/logs/spark_app.log'),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
 logger = logging.getLogger(__name__)
 
+# Emplacements des données et des logs
+DATA_DIR = os.getenv("DATA_DIR", "/data")
+ORDERS_PATH = os.path.join(DATA_DIR, "input", "orders")
+CATEGORY_ANALYSIS_PATH = os.path.join(DATA_DIR, "output", "category_analysis")
+CUSTOMER_ANALYSIS_PATH = os.path.join(DATA_DIR, "output", "customer_analysis")
+CHECKPOINT_DIR = os.path.join(DATA_DIR, "checkpoints")
+APP_LOG_FILE = os.getenv("APP_LOG_FILE", "/logs/spark_app.log")
+
+log_pipeline: Optional[LogPipeline] = None
+
+def setup_logging():
+    """Configuration logging asynchrone: fichier de l'application (avec rotation) et stdout"""
+    global log_pipeline
+    log_pipeline = start_logging(APP_LOG_FILE)
+
 class SparkFailoverJob:
     def __init__(self):
         self.spark: Optional[SparkSession] = None
@@ -35,11 +55,57 @@ class SparkFailoverJob:
         self.restart_count = 0
         self.max_restarts = 5
         self.failure_rate = 0.3  # 30% de chance de panne
+        self.generator = OrdersGenerator.from_env()
+        self.stage_metrics = {}
+        self.storage = StorageFormat.from_env()
+        self.manifest = RunManifest(os.path.join(CHECKPOINT_DIR, "run_manifest.json"))
+        self.outputs = {
+            'category_analysis': VersionedOutput.from_env(CATEGORY_ANALYSIS_PATH),
+            'customer_analysis': VersionedOutput.from_env(CUSTOMER_ANALYSIS_PATH)
+        }
+        self.mode = os.getenv("JOB_MODE", "batch")
+        self.customer_analysis_mode = os.getenv("CUSTOMER_ANALYSIS_MODE", "exact")
+        if self.customer_analysis_mode not in ("exact", "approx"):
+            raise ValueError(f"CUSTOMER_ANALYSIS_MODE inconnu: {self.customer_analysis_mode}")
+        self.heavy_hitters = HeavyHitters.from_env()
+        self.analysis_runner = AnalysisRunner.from_env(CHECKPOINT_DIR)
+        self.tuner = SessionTuner.from_env(CHECKPOINT_DIR)
+        self.events = EventEmitter.from_env()
+        self.faults = FaultInjector.from_env()
+        self.scheduler = CycleScheduler.from_env(ORDERS_PATH)
+        self.backoff = backoff_from_env()
+        self.stream_generate = os.getenv("STREAM_GENERATE", "true").lower() == "true"
+        if self.scheduler.mode == "files" and (self.mode != "streaming" or self.stream_generate):
+            # Un cycle batch réécrit les commandes (overwrite): les fichiers arrivés seraient perdus
+            raise ValueError("SCHEDULE_MODE=files nécessite JOB_MODE=streaming et STREAM_GENERATE=false")
+        self.streaming = StreamingAnalyses.from_env(
+            self.storage,
+            ORDERS_PATH,
+            {'category_analysis': CATEGORY_ANALYSIS_PATH, 'customer_analysis': CUSTOMER_ANALYSIS_PATH},
+            CHECKPOINT_DIR
+        )
+        self.executor_wait_timeout = int(os.getenv("EXECUTOR_WAIT_TIMEOUT", "60"))
+        self.expected_executors = 0
+        self.health_probe = HealthProbe(
+            ttl=float(os.getenv("HEALTH_CACHE_TTL", "10")),
+            timeout=float(os.getenv("HEALTH_TIMEOUT", "15"))
+        )
+        self.session_metrics = {
+            'startups': 0,
+            'teardowns': 0,
+            'last_startup_s': None,
+            'last_teardown_s': None,
+            'startup_total_s': 0.0,
+            'teardown_total_s': 0.0,
+            'recoveries_without_rebuild': 0,
+            'estimated_saved_s': 0.0
+        }
         
     def create_spark_session(self) -> bool:
         """Créer une session Spark avec configuration optimisée"""
+        start = time.perf_counter()
         try:
-            self.spark = SparkSession.builder \
+            builder = SparkSession.builder \
                 .appName("FailoverPOC") \
                 .master(os.getenv("SPARK_MASTER_URL", "local[*]")) \
                 .config("spark.sql.adaptive.enabled", "true") \
@@ -48,137 +114,321 @@ class SparkFailoverJob:
                 .config("spark.sql.execution.arrow.pyspark.enabled", "true") \
                 .config("spark.sql.adaptive.skewJoin.enabled", "true") \
                 .config("spark.dynamicAllocation.enabled", "false") \
-                .config("spark.sql.streaming.checkpointLocation", "/data/checkpoints") \
-                .getOrCreate()
+                .config("spark.sql.streaming.checkpointLocation", CHECKPOINT_DIR) \
+                .config("spark.sql.parquet.filterPushdown", "true") \
+                .config("spark.sql.orc.filterPushdown", "true")
+            # Réglages calculés puis valeurs épinglées: ils priment sur les valeurs ci-dessus
+            logger.info(f"Réglage automatique: {self.tuner.describe()}")
+            tuned = self.tuner.tune()
+            for key, value in {**self.analysis_runner.session_configs(), **tuned}.items():
+                builder = builder.config(key, value)
+            self.spark = builder.getOrCreate()
             
             # Configuration du niveau de log
             self.spark.sparkContext.setLogLevel("WARN")
             
-            logger.info("✓ Session Spark créée avec succès")
+            duration = time.perf_counter() - start
+            self.session_metrics['startups'] += 1
+            self.session_metrics['last_startup_s'] = round(duration, 3)
+            self.session_metrics['startup_total_s'] += duration
+            
+            logger.info(f"✓ Session Spark créée avec succès en {duration:.2f}s")
+            self.events.emit("session_created", duration_s=round(duration, 3),
+                             master=self.spark.sparkContext.master, tuning=self.tuner.decisions)
+            logger.info(f"  - Stockage: {self.storage.describe()}")
+            logger.info(f"  - Injection de pannes: {self.faults.describe()}")
+            logger.info(f"  - Exécution des analyses: {self.analysis_runner.describe()}")
+            if self.customer_analysis_mode == "approx":
+                logger.info(f"  - Analyse client approximative: {self.heavy_hitters.describe()}")
             return True
             
         except Exception as e:
             logger.error(f"✗ Erreur création session Spark: {e}")
+            self.events.emit("session_failed", duration_s=round(time.perf_counter() - start, 3),
+                             error=str(e))
             return False
     
-    def generate_sample_data(self):
+    @property
+    def cycle_id(self) -> Optional[str]:
+        """Identifiant du cycle batch courant (le mode streaming n'a pas de manifeste)"""
+        return self.manifest.cycle_id if self.mode == "batch" else None
+    
+    def generate_sample_data(self, write_mode: str = "overwrite"):
         """Générer des données d'exemple pour le traitement"""
         try:
-            # Données d'exemple : commandes e-commerce
-            orders_data = []
-            for i in range(1000):
-                orders_data.append({
-                    'order_id': f'ORD_{i:04d}',
-                    'customer_id': f'CUST_{random.randint(1, 100):03d}',
-                    'product_category': random.choice(['Electronics', 'Clothing', 'Books', 'Home']),
-                    'amount': round(random.uniform(10.0, 500.0), 2),
-                    'timestamp': datetime.now().isoformat()
-                })
-            
-            # Créer le DataFrame
-            schema = StructType([
-                StructField("order_id", StringType(), True),
-                StructField("customer_id", StringType(), True),
-                StructField("product_category", StringType(), True),
-                StructField("amount", IntegerType(), True),
-                StructField("timestamp", StringType(), True)
-            ])
+            # Données d'exemple : commandes e-commerce, générées sur les executors
+            df = self.generator.build(self.spark)
             
-            df = self.spark.createDataFrame(orders_data)
+            # Persister la source: l'écriture la matérialise, le traitement la relit en mémoire
+            df = df.persist(StorageLevel.MEMORY_AND_DISK)
             
             # Sauvegarder les données sources
-            df.write \
-              .mode("overwrite") \
-              .option("header", "true") \
-              .csv("/data/input/orders")
+            with self.timed_stage("generate") as stage:
+                self.storage.write(df, ORDERS_PATH, partitioned=True, mode=write_mode)
+                stage["rows"] = self.generator.rows
             
-            logger.info(f"✓ Données générées: {df.count()} commandes")
+            logger.info(f"✓ Données générées: {self.generator.rows} commandes")
             return df
             
         except Exception as e:
             logger.error(f"✗ Erreur génération données: {e}")
             raise
     
+    def read_orders(self):
+        """Relire les commandes committées avec le schéma typé"""
+        return self.storage.read(self.spark, ORDERS_PATH, ORDERS_SCHEMA)
+    
+    @contextmanager
+    def timed_stage(self, name: str):
+        """Mesurer la durée d'une étape du cycle et émettre l'événement correspondant"""
+        metrics = self.stage_metrics.setdefault(name, {})
+        start = time.perf_counter()
+        status = "failed"
+        try:
+            yield metrics
+            status = "ok"
+        finally:
+            duration = time.perf_counter() - start
+            metrics["duration_s"] = round(duration, 3)
+            logger.info(f"⏱ Étape {name}: {duration:.3f}s")
+            self.events.emit("stage", stage=name, status=status, cycle_id=self.cycle_id, **metrics)
+            self.faults.on_stage(name, status, metrics["duration_s"])
+    
+    def build_pre_aggregate(self, df):
+        """Pré-agrégat partiel (client, catégorie) partagé par les deux analyses"""
+        return df.groupBy("customer_id", "product_category") \
+                 .agg(
+                     count("*").alias("orders"),
+                     spark_sum("amount").alias("amount_sum"),
+                     spark_max("amount").alias("amount_max")
+                 )
+    
     def process_data(self, df):
         """Traiter les données avec possibilité de panne"""
+        pre_aggregate = None
         try:
-            # Simuler une panne aléatoire
-            if random.random() < self.failure_rate:
-                raise Exception("Panne simulée du traitement de données")
+            # Simuler une panne aléatoire (seedée, voir FAULT_SEED)
+            self.faults.check("before_processing", self.failure_rate)
+            self.faults.lose_session(self.spark)
             
             # Traitement des données
             logger.info("Début du traitement des données...")
             
-            # Analyses par catégorie
-            category_analysis = df.groupBy("product_category") \
+            source_obs = Observation("source")
+            source = self.faults.wrap("mid_aggregation", df).observe(source_obs, count(lit(1)).alias("rows"))
+            
+            if self.customer_analysis_mode == "approx":
+                # Pas de pré-agrégat (client, catégorie): les catégories s'agrègent côté map,
+                # les clients passent par des sketches; la source est relue depuis le cache
+                if not df.is_cached:
+                    df.persist(StorageLevel.MEMORY_AND_DISK)
+                pre_aggregate = source.groupBy("product_category") \
                                  .agg(
-                                     count("*").alias("total_orders"),
-                                     avg("amount").alias("avg_amount"),
-                                     spark_max("amount").alias("max_amount")
-                                 ) \
-                                 .orderBy("total_orders", ascending=False)
+                                     count("*").alias("orders"),
+                                     spark_sum("amount").alias("amount_sum"),
+                                     spark_max("amount").alias("amount_max")
+                                 )
+                customer_analysis = lambda metrics: self.heavy_hitters.analyze(source, metrics)
+            else:
+                # Un seul scan de la source: le pré-agrégat est persisté puis réutilisé
+                pre_aggregate = self.build_pre_aggregate(source).persist(StorageLevel.MEMORY_AND_DISK)
+                
+                # Analyses par client
+                customer_analysis = pre_aggregate.groupBy("customer_id") \
+                                     .agg(
+                                         spark_sum("orders").alias("total_orders"),
+                                         (spark_sum("amount_sum") / spark_sum("orders")).alias("avg_amount")
+                                     ) \
+                                     .filter(col("total_orders") > 5) \
+                                     .orderBy("total_orders", ascending=False)
             
-            # Analyses par client
-            customer_analysis = df.groupBy("customer_id") \
+            # Analyses par catégorie
+            category_analysis = pre_aggregate.groupBy("product_category") \
                                  .agg(
-                                     count("*").alias("total_orders"),
-                                     avg("amount").alias("avg_amount")
+                                     spark_sum("orders").alias("total_orders"),
+                                     (spark_sum("amount_sum") / spark_sum("orders")).alias("avg_amount"),
+                                     spark_max("amount_max").alias("max_amount")
                                  ) \
-                                 .filter(col("total_orders") > 5) \
                                  .orderBy("total_orders", ascending=False)
             
-            # Sauvegarder les résultats
-            category_analysis.write \
-                            .mode("overwrite") \
-                            .option("header", "true") \
-                            .csv("/data/output/category_analysis")
+            def category_stage():
+                executed = self.run_analysis_stage("category_analysis", category_analysis)
+                # Panne après l'écriture de la première analyse
+                self.faults.check("after_partial_write")
+                return executed
             
-            customer_analysis.write \
-                            .mode("overwrite") \
-                            .option("header", "true") \
-                            .csv("/data/output/customer_analysis")
+            # Sauvegarder les résultats, en sautant les étapes déjà committées;
+            # les deux analyses sont indépendantes et soumises en parallèle
+            executed = self.analysis_runner.run(self.spark, [
+                ("category_analysis", category_stage),
+                ("customer_analysis",
+                 lambda: self.run_analysis_stage("customer_analysis", customer_analysis))
+            ])
             
             logger.info("✓ Traitement terminé avec succès")
-            logger.info(f"  - Analyses par catégorie: {category_analysis.count()} lignes")
-            logger.info(f"  - Analyses par client: {customer_analysis.count()} lignes")
+            if any(executed):
+                logger.info(f"  - Commandes analysées: {source_obs.get['rows']}")
+            for stage in ("category_analysis", "customer_analysis"):
+                rows = self.manifest.state['stages'][stage].get('rows')
+                logger.info(f"  - {stage}: {rows} lignes")
             
-            return True
+            return self.stage_metrics
             
         except Exception as e:
             logger.error(f"✗ Erreur traitement: {e}")
             raise
+        finally:
+            self.release(pre_aggregate, df)
     
-    def health_check(self) -> bool:
-        """Vérifier l'état de santé de Spark"""
+    def release(self, *dataframes):
+        """Libérer les caches; sans effet si la session a été perdue entre-temps"""
+        for df in dataframes:
+            if df is None:
+                continue
+            try:
+                df.unpersist()
+            except Exception as e:
+                logger.warning(f"⚠ Cache non libéré: {e}")
+    
+    def run_analysis_stage(self, stage: str, analysis) -> bool:
+        """Committer une nouvelle version d'une analyse; retourne False si l'étape est déjà committée
+        
+        `analysis` est un DataFrame, ou une fonction (métriques de l'étape) -> DataFrame
+        pour les analyses qui lancent des jobs avant l'écriture
+        """
+        if self.manifest.is_committed(stage):
+            logger.info(f"↷ Étape {stage} déjà committée, ignorée")
+            return False
+        
+        # Le comptage vient de l'empreinte du contenu, calculée avant l'écriture
+        with self.timed_stage(stage) as metrics:
+            if callable(analysis):
+                analysis = analysis(metrics)
+            # La panne pendant l'écriture vise le staging, après le calcul de l'empreinte
+            metrics.update(self.outputs[stage].commit(
+                analysis, self.storage,
+                before_write=lambda df: self.faults.wrap("during_write", df, key=stage)
+            ))
+        self.manifest.commit(stage, self.stage_metrics[stage])
+        return True
+    
+    def run_cycle(self):
+        """Exécuter un cycle, en reprenant à la première étape non committée"""
+        self.stage_metrics = {}
+        
+        if self.manifest.in_progress():
+            logger.info(f"↩ Reprise du cycle {self.manifest.cycle_id} à l'étape {self.manifest.next_stage()}")
+        else:
+            logger.info(f"🆕 Nouveau cycle {self.manifest.begin_cycle()}")
+        
+        if self.manifest.is_committed("generate"):
+            df = self.read_orders()
+        else:
+            df = self.generate_sample_data()
+            self.manifest.commit("generate", self.stage_metrics["generate"])
+        
         try:
-            if not self.spark:
-                return False
-                
-            # Test simple de connectivité
-            test_df = self.spark.range(1)
-            test_df.count()
-            return True
-            
+            self.faults.kill_executor(self.spark)
         except Exception:
-            return False
+            # process_data ne s'exécute pas: libérer ici le cache des commandes générées
+            self.release(df)
+            raise
+        self.process_data(df)
+        self.manifest.complete_cycle()
+    
+    def health_check(self) -> bool:
+        """Vérifier l'état de santé de Spark"""
+        probes = self.health_probe.metrics['probes']
+        healthy = self.health_probe.check(self.spark)
+        if self.health_probe.metrics['probes'] != probes:
+            self.events.emit("health_probe", healthy=healthy,
+                             tier=self.health_probe.metrics['last_tier'],
+                             latency_ms=self.health_probe.metrics['last_latency_ms'])
+        return healthy
     
     def cleanup(self):
         """Nettoyer les ressources Spark"""
         try:
             if self.spark:
+                self.streaming.stop()
+                start = time.perf_counter()
                 self.spark.stop()
                 self.spark = None
-                logger.info("✓ Session Spark nettoyée")
+                self.health_probe.invalidate()
+                
+                duration = time.perf_counter() - start
+                self.session_metrics['teardowns'] += 1
+                self.session_metrics['last_teardown_s'] = round(duration, 3)
+                self.session_metrics['teardown_total_s'] += duration
+                logger.info(f"✓ Session Spark nettoyée en {duration:.2f}s")
+                self.events.emit("session_stopped", duration_s=round(duration, 3))
         except Exception as e:
             logger.error(f"✗ Erreur nettoyage: {e}")
     
+    def run_streaming_cycle(self):
+        """Cycle en mode streaming: les agrégats sont maintenus par les requêtes actives"""
+        if not self.streaming.is_active():
+            # Une requête morte en erreur passe par la classification et le backoff;
+            # le cycle suivant la reprend depuis son checkpoint
+            self.streaming.check()
+            self.streaming.start(self.spark)
+        
+        if self.stream_generate:
+            # Nouveaux fichiers ajoutés au répertoire surveillé
+            self.stage_metrics = {}
+            self.generate_sample_data(write_mode="append").unpersist()
+        
+        self.streaming.check()
+        for name, progress in self.streaming.progress().items():
+            if progress:
+                logger.info(f"  - {name}: batch {progress['batchId']}, "
+                            f"{progress['numInputRows']} nouvelles lignes")
+    
+    def wait_for_executors(self) -> bool:
+        """Attendre la ré-acquisition des executors perdus"""
+        expected = max(self.expected_executors, 1)
+        deadline = time.monotonic() + self.executor_wait_timeout
+        while self.running and time.monotonic() < deadline:
+            try:
+                available = executor_count(self.spark)
+            except Exception:
+                return False
+            if available >= expected:
+                logger.info(f"✓ Executors ré-acquis: {available}/{expected}")
+                return True
+            logger.info(f"⏳ Attente des executors: {available}/{expected}")
+            time.sleep(2)
+        return False
+    
+    def recover(self, kind: FailureKind):
+        """Appliquer la stratégie de reprise associée à la classe de panne"""
+        if kind is FailureKind.EXECUTOR_LOST and not self.wait_for_executors():
+            logger.warning("⚠ Executors non ré-acquis à temps, reconstruction de la session")
+            kind = FailureKind.SESSION_LOST
+        
+        self.health_probe.invalidate()
+        if kind is FailureKind.SESSION_LOST:
+            self.cleanup()
+            return
+        
+        # Session conservée: on évite un arrêt et un redémarrage complets
+        saved = (self.session_metrics['last_startup_s'] or 0) + (self.session_metrics['last_teardown_s'] or 0)
+        self.session_metrics['recoveries_without_rebuild'] += 1
+        self.session_metrics['estimated_saved_s'] += saved
+        logger.info(f"♻ Session Spark conservée ({kind.value}), économie estimée ~{saved:.2f}s "
+                    f"(cumul {self.session_metrics['estimated_saved_s']:.2f}s)")
+    
     def run_with_failover(self):
         """Exécuter le job avec mécanisme de failover"""
         self.running = True
         
         logger.info("🚀 Démarrage du job Spark avec failover")
+        self.events.emit("job_start", mode=self.mode, max_restarts=self.max_restarts)
+        logger.info(f"  - Ordonnancement: {self.scheduler.describe()}, backoff: {self.backoff.describe()}")
+        self.scheduler.start()
         
         while self.running and self.restart_count < self.max_restarts:
+            cycle_start = None
             try:
                 # Créer la session Spark si nécessaire
                 if not self.spark or not self.health_check():
@@ -187,35 +437,85 @@ class SparkFailoverJob:
                         raise Exception("Impossible de créer la session Spark")
                 
                 logger.info(f"🔄 Exécution #{self.restart_count + 1}")
+                lag = self.scheduler.begin_cycle()
+                self.events.emit("cycle_start", mode=self.mode, attempt=self.restart_count + 1, **lag)
+                if lag['schedule_lag_s'] is not None or lag['data_lag_s'] is not None:
+                    logger.info(f"  - Déclenchement {lag['trigger']}: retard {lag['schedule_lag_s']}s, "
+                                f"{lag['files']} fichier(s), âge des données {lag['data_lag_s']}s")
+                self.faults.on_cycle_start()
+                cycle_start = time.perf_counter()
                 
                 # Générer et traiter les données
-                df = self.generate_sample_data()
-                self.process_data(df)
+                if self.mode == "streaming":
+                    self.run_streaming_cycle()
+                else:
+                    self.run_cycle()
+                self.expected_executors = max(self.expected_executors, executor_count(self.spark))
+                
+                duration = time.perf_counter() - cycle_start
+                self.scheduler.end_cycle()
+                self.events.emit("cycle_end", status="ok", mode=self.mode,
+                                 cycle_id=self.cycle_id,
+                                 duration_s=round(duration, 3),
+                                 stages=self.stage_metrics,
+                                 freshness_s=round(lag['data_lag_s'] + duration, 3)
+                                 if lag['data_lag_s'] is not None else None)
+                self.tuner.record(
+                    mode=self.mode,
+                    rows=self.generator.rows,
+                    input_bytes=directory_size(ORDERS_PATH),
+                    duration_s=round(duration, 3),
+                    shuffle_partitions=int(self.spark.conf.get("spark.sql.shuffle.partitions")),
+                    stages={name: m.get("duration_s") for name, m in self.stage_metrics.items()}
+                )
+                fault = self.faults.on_cycle_success()
+                if fault:
+                    self.events.emit("fault_recovered", **fault)
                 
                 # Réinitialiser le compteur de redémarrage en cas de succès
                 self.restart_count = 0
                 
-                # Attendre avant le prochain cycle
+                # Attendre le prochain déclenchement
                 logger.info("⏳ Attente avant le prochain cycle...")
-                time.sleep(30)
+                if not self.scheduler.wait_next():
+                    break
                 
             except Exception as e:
-                logger.error(f"💥 Erreur dans le job: {e}")
+                self.scheduler.end_cycle()
+                kind = classify_failure(e, self.spark)
+                self.faults.on_failure(kind.value)
+                logger.error(f"💥 Erreur dans le job ({kind.value}): {e}")
+                self.events.emit("cycle_end", status="failed", mode=self.mode, kind=kind.value,
+                                 duration_s=round(time.perf_counter() - cycle_start, 3) if cycle_start else None,
+                                 error=str(e))
                 
-                self.cleanup()
+                # Les requêtes de streaming reprendront depuis leur checkpoint
+                self.streaming.stop()
+                self.recover(kind)
                 self.restart_count += 1
                 
                 if self.restart_count < self.max_restarts:
-                    wait_time = min(2 ** self.restart_count, 60)  # Backoff avec limite
+                    wait_time = self.backoff.delay(self.restart_count)
                     logger.info(f"🔄 Redémarrage dans {wait_time}s (tentative {self.restart_count}/{self.max_restarts})")
-                    time.sleep(wait_time)
+                    self.events.emit("restart", kind=kind.value, attempt=self.restart_count,
+                                     max_restarts=self.max_restarts, backoff_s=wait_time, error=str(e))
+                    self.scheduler.sleep(wait_time)
                 else:
                     logger.error("❌ Nombre maximum de redémarrages atteint")
+                    self.events.emit("restart", kind=kind.value, attempt=self.restart_count,
+                                     max_restarts=self.max_restarts, backoff_s=None, error=str(e),
+                                     exhausted=True)
                     self.running = False
                     break
         
+        self.scheduler.stop()
+        self.analysis_runner.shutdown()
         self.cleanup()
         logger.info("🏁 Job terminé")
+        self.events.emit("job_end", restart_count=self.restart_count)
+        if self.faults.records or self.faults.missed:
+            logger.info(f"📏 Bilan des pannes injectées: {self.faults.summary()}")
+            self.events.emit("fault_summary", summary=self.faults.summary())
 
 def signal_handler(signum, frame):
     """Gestionnaire pour arrêt propre"""
@@ -223,7 +523,13 @@ def signal_handler(signum, frame):
     global job
     if job:
         job.running = False
+        job.scheduler.stop()
+        # Annuler les analyses en cours avant l'arrêt de la session
+        job.analysis_runner.shutdown()
         job.cleanup()
+    # Écrire les logs encore en file avant de quitter
+    if log_pipeline:
+        log_pipeline.stop()
     sys.exit(0)
 
 def main():
@@ -231,10 +537,10 @@ def main():
     global job
     
     # Créer les répertoires nécessaires
-    os.makedirs("/data/input", exist_ok=True)
-    os.makedirs("/data/output", exist_ok=True)
-    os.makedirs("/data/checkpoints", exist_ok=True)
-    os.makedirs("/logs", exist_ok=True)
+    setup_logging()
+    os.makedirs(os.path.join(DATA_DIR, "input"), exist_ok=True)
+    os.makedirs(os.path.join(DATA_DIR, "output"), exist_ok=True)
+    os.makedirs(CHECKPOINT_DIR, exist_ok=True)
     
     # Installer les gestionnaires de signaux
     signal.signal(signal.SIGINT, signal_handler)
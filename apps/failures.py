@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Taxonomie des pannes du POC Spark Failover
+Détermine si une erreur se traite avec la session vivante ou impose sa reconstruction
+"""
+
+from enum import Enum
+from typing import Optional
+
+from pyspark.sql import SparkSession
+
+
+class FailureKind(Enum):
+    """Classes de pannes et stratégie de reprise associée"""
+    TRANSIENT = "transient"          # Erreur de tâche ou de données: réessayer avec la session vivante
+    EXECUTOR_LOST = "executor_lost"  # Perte d'executor: attendre la ré-acquisition
+    SESSION_LOST = "session_lost"    # Perte du driver ou du master: reconstruire la session
+
+
+class TransientJobError(Exception):
+    """Erreur de traitement qui ne met pas en cause la session Spark"""
+
+
+class ExecutorLostError(Exception):
+    """Perte d'un ou plusieurs executors"""
+
+
+class SessionLostError(Exception):
+    """Session Spark inutilisable (driver, SparkContext ou master perdu)"""
+
+
+# Marqueurs rencontrés dans les messages Py4J / Spark
+SESSION_LOST_MARKERS = (
+    'SparkContext was shut down',
+    'Cannot call methods on a stopped SparkContext',
+    'SparkContext has been shutdown',
+    'Master removed our application',
+    'Application has been killed',
+    'Answer from Java side is empty',
+    'Error while sending or receiving',
+    'Connection refused',
+    'Py4JNetworkError',
+)
+
+EXECUTOR_LOST_MARKERS = (
+    'ExecutorLostFailure',
+    'Lost executor',
+    'executor lost',
+    'FetchFailed',
+    'Executor heartbeat timed out',
+    'Container killed',
+)
+
+
+def session_is_stopped(spark: Optional[SparkSession]) -> bool:
+    """Vérifier si le SparkContext sous-jacent est arrêté ou injoignable"""
+    if spark is None:
+        return True
+    try:
+        return spark.sparkContext._jsc.sc().isStopped()
+    except Exception:
+        return True
+
+
+def classify_failure(error: BaseException, spark: Optional[SparkSession] = None) -> FailureKind:
+    """Classer une exception selon la stratégie de reprise à appliquer"""
+    if isinstance(error, SessionLostError):
+        return FailureKind.SESSION_LOST
+    if isinstance(error, ExecutorLostError):
+        return FailureKind.EXECUTOR_LOST
+    if isinstance(error, TransientJobError):
+        return FailureKind.TRANSIENT
+
+    message = f"{type(error).__name__}: {error}"
+
+    if any(marker in message for marker in SESSION_LOST_MARKERS) or session_is_stopped(spark):
+        return FailureKind.SESSION_LOST
+    if any(marker.lower() in message.lower() for marker in EXECUTOR_LOST_MARKERS):
+        return FailureKind.EXECUTOR_LOST
+    return FailureKind.TRANSIENT
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Injection de pannes déterministe pour le POC Spark Failover
+Points d'injection configurables, planning seedé et mesure du temps de reprise (MTTR)
+"""
+
+import os
+import time
+import random
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from pyspark.sql import DataFrame, SparkSession
+from pyspark.sql.functions import coalesce, lit, raise_error, spark_partition_id, when
+
+from failures import ExecutorLostError, TransientJobError
+
+logger = logging.getLogger(__name__)
+
+# Points d'injection, dans l'ordre où le cycle les traverse
+FAULT_POINTS = (
+    'before_processing',    # Panne historique: avant tout traitement
+    'mid_aggregation',      # Échec d'une tâche pendant le calcul du pré-agrégat
+    'during_write',         # Échec d'une tâche pendant l'écriture d'une analyse
+    'after_partial_write',  # Panne du driver entre les deux analyses
+    'executor_kill',        # Perte d'un executor
+    'session_loss',         # Arrêt du SparkContext
+)
+
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    """Parser 'point=taux,point=taux'"""
+    rates = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        point, _, rate = item.partition('=')
+        point = point.strip()
+        if point not in FAULT_POINTS:
+            raise ValueError(f"Point d'injection inconnu: {point}")
+        rates[point] = float(rate)
+    return rates
+
+
+def parse_schedule(spec: str) -> Dict[int, List[str]]:
+    """Parser 'cycle:point,cycle:point' (numéro de tentative de cycle, à partir de 1)"""
+    schedule: Dict[int, List[str]] = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        cycle, _, point = item.partition(':')
+        point = point.strip()
+        if point not in FAULT_POINTS:
+            raise ValueError(f"Point d'injection inconnu: {point}")
+        schedule.setdefault(int(cycle), []).append(point)
+    return schedule
+
+
+class FaultInjector:
+    """Décide des pannes à injecter et mesure détection, reprise et travail refait"""
+
+    def __init__(self,
+                 rates: Optional[Dict[str, float]] = None,
+                 schedule: Optional[Dict[int, List[str]]] = None,
+                 seed: Optional[int] = None):
+        self.rates = rates or {}
+        self.schedule = schedule or {}
+        self.seed = seed if seed is not None else random.randrange(2 ** 31)
+        self.lock = threading.Lock()
+        self.attempt = 0
+        self.active: Optional[Dict] = None
+        self.records: List[Dict] = []
+        self.missed: List[Dict] = []
+        self._attempt_stages: List[Dict] = []
+
+    @classmethod
+    def from_env(cls) -> 'FaultInjector':
+        seed = os.getenv("FAULT_SEED")
+        return cls(
+            rates=parse_rates(os.getenv("FAULT_RATES", "")),
+            schedule=parse_schedule(os.getenv("FAULT_SCHEDULE", "")),
+            seed=int(seed) if seed else None
+        )
+
+    def describe(self) -> str:
+        return f"seed={self.seed}, taux={self.rates or 'aucun'}, planning={self.schedule or 'aucun'}"
+
+    # --- Décision ---------------------------------------------------------
+
+    def should_inject(self, point: str, rate: Optional[float] = None, key: str = "") -> bool:
+        """Tirage déterministe: le planning prime, sinon le taux du point
+
+        Le tirage ne dépend que du seed, de la tentative, du point et de la clé: il est reproductible
+        même lorsque les analyses concurrentes passent les points dans un ordre variable
+        """
+        draw = random.Random(f"{self.seed}:{self.attempt}:{point}:{key}").random()
+        if self.active is not None:
+            # Une seule panne à la fois, pour mesurer sa reprise isolément
+            return False
+        if point in self.schedule.get(self.attempt, []):
+            return True
+        rate = self.rates.get(point, 0.0) if rate is None else rate
+        return draw < rate
+
+    def _arm(self, point: str, **details) -> bool:
+        """Activer la panne; False si une autre panne concurrente a été armée entre-temps"""
+        with self.lock:
+            if self.active is not None:
+                return False
+            self.active = {
+                'point': point,
+                'attempt': self.attempt,
+                'injected_at': time.time(),
+                'detected_at': None,
+                'kind': None,
+                'failed_stages': [],
+                **details
+            }
+        logger.warning(f"💣 Panne injectée: {point} (cycle #{self.attempt})")
+        return True
+
+    # --- Points d'injection -----------------------------------------------
+
+    def check(self, point: str, rate: Optional[float] = None):
+        """Points côté driver: lever immédiatement l'erreur correspondante"""
+        if not self.should_inject(point, rate) or not self._arm(point):
+            return
+        if point == 'executor_kill':
+            raise ExecutorLostError("Panne injectée: executor perdu")
+        raise TransientJobError(f"Panne injectée: {point}")
+
+    def wrap(self, point: str, df: DataFrame, key: str = "") -> DataFrame:
+        """Points côté executors: une tâche échoue pendant l'exécution du plan"""
+        if not self.should_inject(point, key=key):
+            return df
+        # La partition 0 peut être vide: viser la première partition qui produit une ligne
+        first = df.select(spark_partition_id().alias("partition")).limit(1).collect()
+        if not first:
+            self._miss(point, "aucune ligne à traiter", attempt=self.attempt)
+            return df
+        if not self._arm(point):
+            return df
+        # raise_error natif: pas d'UDF Python, seule cette partition échoue
+        failing = when(spark_partition_id() == first[0]["partition"],
+                       raise_error(lit(f"Panne injectée: {point}")))
+        return df.filter(coalesce(failing.cast("boolean"), lit(True)))
+
+    def kill_executor(self, spark: SparkSession):
+        """Tuer un executor réel (hors mode local) puis signaler la perte"""
+        if not self.should_inject('executor_kill') or not self._arm('executor_kill'):
+            return
+        sc = spark.sparkContext
+        killed = None
+        try:
+            executors = sc._jsc.sc().getExecutorIds()
+            if not sc.master.startswith("local") and executors.size() > 0:
+                killed = executors.apply(0)
+                # Demander un remplaçant: l'allocation dynamique est désactivée
+                sc._jsc.sc().killExecutor(killed)
+                sc._jsc.sc().requestExecutors(1)
+        except Exception as e:
+            logger.warning(f"⚠ Kill d'executor impossible ({e}), perte simulée")
+        self.active['executor_id'] = killed
+        raise ExecutorLostError(f"Panne injectée: executor {killed or 'simulé'} perdu")
+
+    def lose_session(self, spark: SparkSession):
+        """Arrêter le SparkContext: la prochaine action échoue comme une vraie perte de driver"""
+        if not self.should_inject('session_loss') or not self._arm('session_loss'):
+            return
+        spark.sparkContext.stop()
+
+    # --- Mesures ----------------------------------------------------------
+
+    def _miss(self, point: str, reason: str, attempt: int):
+        """Panne tirée mais jamais déclenchée: comptée à part, hors MTTR"""
+        self.missed.append({'point': point, 'attempt': attempt, 'reason': reason})
+        logger.warning(f"💨 Panne {point} non déclenchée (cycle #{attempt}): {reason}")
+
+    def on_cycle_start(self):
+        self.attempt += 1
+        self._attempt_stages = []
+
+    def on_stage(self, stage: str, status: str, duration_s: float):
+        self._attempt_stages.append({'stage': stage, 'status': status, 'duration_s': duration_s})
+
+    def on_failure(self, kind: str):
+        """Panne détectée par la boucle de failover"""
+        if self.active is None or self.active['detected_at'] is not None:
+            return
+        self.active['detected_at'] = time.time()
+        self.active['kind'] = kind
+        self.active['failed_stages'] = list(self._attempt_stages)
+
+    def on_cycle_success(self) -> Optional[Dict]:
+        """Cycle réussi après une panne: clôturer la mesure"""
+        fault = self.active
+        if fault is None:
+            return None
+        if fault['detected_at'] is None:
+            # Armée mais jamais exécutée (plan non lancé, étape reprise): libérer l'injection
+            self.active = None
+            self._miss(fault['point'], "plan armé mais non exécuté", attempt=fault['attempt'])
+            return None
+
+        # Travail refait: étapes de la tentative en échec exécutées à nouveau après reprise
+        rerun = {s['stage'] for s in self._attempt_stages}
+        redone = [s for s in fault['failed_stages'] if s['stage'] in rerun]
+        now = time.time()
+        record = {
+            'point': fault['point'],
+            'kind': fault['kind'],
+            'attempt': fault['attempt'],
+            'time_to_detect_s': round(fault['detected_at'] - fault['injected_at'], 3),
+            'time_to_recover_s': round(now - fault['injected_at'], 3),
+            'stages_redone': [s['stage'] for s in redone],
+            'work_redone_s': round(sum(s['duration_s'] for s in redone), 3)
+        }
+        if fault.get('executor_id'):
+            record['executor_id'] = fault['executor_id']
+
+        self.records.append(record)
+        self.active = None
+        logger.info(f"📏 Reprise après {record['point']}: détection {record['time_to_detect_s']}s, "
+                    f"reprise {record['time_to_recover_s']}s, travail refait {record['work_redone_s']}s "
+                    f"({', '.join(record['stages_redone']) or 'aucune étape'})")
+        return record
+
+    def summary(self) -> Dict[str, Dict]:
+        """MTTR moyen par point d'injection, et nombre de pannes tirées mais non déclenchées"""
+        summary: Dict[str, Dict] = {}
+        for record in self.records + self.missed:
+            s = summary.setdefault(record['point'], {'faults': 0, 'not_fired': 0, 'detect_s': 0.0,
+                                                     'recover_s': 0.0, 'redone_s': 0.0})
+            if 'reason' in record:
+                s['not_fired'] += 1
+                continue
+            s['faults'] += 1
+            s['detect_s'] += record['time_to_detect_s']
+            s['recover_s'] += record['time_to_recover_s']
+            s['redone_s'] += record['work_redone_s']
+        return {
+            point: {
+                'faults': s['faults'],
+                'not_fired': s['not_fired'],
+                'mean_time_to_detect_s': round(s['detect_s'] / s['faults'], 3) if s['faults'] else None,
+                'mttr_s': round(s['recover_s'] / s['faults'], 3) if s['faults'] else None,
+                'mean_work_redone_s': round(s['redone_s'] / s['faults'], 3) if s['faults'] else None
+            }
+            for point, s in summary.items()
+        }
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Sonde de santé à plusieurs niveaux pour le POC Spark Failover
+Les vérifications légères passent d'abord; un job Spark n'est lancé qu'en dernier recours
+"""
+
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+from pyspark.sql import SparkSession
+
+from failures import session_is_stopped
+
+logger = logging.getLogger(__name__)
+
+PROBE_JOB_GROUP = "health-probe"
+
+
+def executor_count(spark: SparkSession) -> int:
+    """Nombre d'executors enregistrés (hors driver; le driver compte en mode local)"""
+    sc = spark.sparkContext
+    infos = sc._jsc.sc().statusTracker().getExecutorInfos()
+    if sc.master.startswith("local"):
+        return len(infos)
+    return max(len(infos) - 1, 0)
+
+
+class ProbeTimeout(Exception):
+    """La sonde n'a pas répondu dans le délai imparti"""
+
+
+def run_with_timeout(fn: Callable, timeout: float):
+    """Exécuter fn dans un thread démon et abandonner l'attente après timeout secondes"""
+    outcome = {}
+
+    def target():
+        try:
+            outcome['result'] = fn()
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=target, name="health-probe", daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    if thread.is_alive():
+        raise ProbeTimeout(f"Sonde sans réponse après {timeout}s")
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome.get('result')
+
+
+class HealthProbe:
+    """Sonde mise en cache (TTL) avec délai maximal et escalade progressive"""
+
+    def __init__(self, ttl: float = 10.0, timeout: float = 15.0):
+        self.ttl = ttl
+        self.timeout = timeout
+        self._cached: Optional[bool] = None
+        self._cached_at = 0.0
+        self.metrics = {
+            'probes': 0,
+            'cache_hits': 0,
+            'job_probes': 0,
+            'timeouts': 0,
+            'last_result': None,
+            'last_tier': None,
+            'last_latency_ms': None
+        }
+
+    def invalidate(self):
+        """Oublier le dernier résultat (après une panne ou une nouvelle session)"""
+        self._cached = None
+
+    def _cheap_tiers(self, spark: SparkSession) -> Optional[bool]:
+        """Niveaux légers: JVM vivante, status tracker, executors; None si non concluant"""
+        if session_is_stopped(spark):
+            self.metrics['last_tier'] = 'jvm'
+            return False
+
+        # Le status tracker répond sans passer par le scheduler
+        spark.sparkContext.statusTracker().getActiveJobsIds()
+
+        self.metrics['last_tier'] = 'executors'
+        if executor_count(spark) > 0:
+            return True
+        return None
+
+    def _job_tier(self, spark: SparkSession) -> bool:
+        """Dernier recours: un vrai job, annulable via son groupe"""
+        self.metrics['job_probes'] += 1
+        self.metrics['last_tier'] = 'job'
+        sc = spark.sparkContext
+        sc.setJobGroup(PROBE_JOB_GROUP, "Sonde de santé", interruptOnCancel=True)
+        try:
+            spark.range(1).count()
+            return True
+        finally:
+            sc.setLocalProperty("spark.jobGroup.id", None)
+
+    def _probe(self, spark: SparkSession) -> bool:
+        healthy = self._cheap_tiers(spark)
+        if healthy is None:
+            healthy = self._job_tier(spark)
+        return healthy
+
+    def check(self, spark: Optional[SparkSession]) -> bool:
+        """Vérifier l'état de santé, en réutilisant un résultat récent si disponible"""
+        if spark is None:
+            return False
+
+        now = time.monotonic()
+        if self._cached is not None and now - self._cached_at < self.ttl:
+            self.metrics['cache_hits'] += 1
+            return self._cached
+
+        self.metrics['probes'] += 1
+        start = time.perf_counter()
+        try:
+            healthy = run_with_timeout(lambda: self._probe(spark), self.timeout)
+        except ProbeTimeout as e:
+            self.metrics['timeouts'] += 1
+            logger.warning(f"⚠ {e} (niveau {self.metrics['last_tier']})")
+            try:
+                spark.sparkContext.cancelJobGroup(PROBE_JOB_GROUP)
+            except Exception:
+                pass
+            healthy = False
+        except Exception:
+            healthy = False
+
+        latency_ms = (time.perf_counter() - start) * 1000
+        self.metrics['last_latency_ms'] = round(latency_ms, 1)
+        self.metrics['last_result'] = healthy
+        logger.info(f"🩺 Sonde de santé: {'OK' if healthy else 'KO'} "
+                    f"(niveau {self.metrics['last_tier']}, {latency_ms:.1f} ms)")
+
+        self._cached = healthy
+        self._cached_at = time.monotonic()
+        return healthy
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Analyse client approximative à forte cardinalité (heavy hitters)
+Candidats par Misra-Gries (freqItems), comptages bornés par count-min sketch, top-N exact sur les seuls candidats
+"""
+
+import os
+import math
+import logging
+from typing import Dict
+
+from pyspark.sql import DataFrame
+from pyspark.sql.functions import avg, col, count, expr
+
+logger = logging.getLogger(__name__)
+
+
+class HeavyHitters:
+    """Top-N des clients les plus fréquents sans shuffle ni tri global de tous les clients"""
+
+    def __init__(self,
+                 top_n: int = 100,
+                 support: float = 0.001,
+                 epsilon: float = 0.0001,
+                 confidence: float = 0.99,
+                 seed: int = 42,
+                 min_orders: int = 5):
+        # freqItems refuse un support inférieur à 1e-4
+        if not 1e-4 <= support <= 1:
+            raise ValueError(f"Support hors de [1e-4, 1]: {support}")
+        if not 0 < epsilon < 1 or not 0 < confidence < 1:
+            raise ValueError("epsilon et confidence doivent être dans ]0, 1[")
+        self.top_n = top_n
+        self.support = support
+        self.epsilon = epsilon
+        self.confidence = confidence
+        self.seed = seed
+        self.min_orders = min_orders
+
+    @classmethod
+    def from_env(cls) -> 'HeavyHitters':
+        return cls(
+            top_n=int(os.getenv("HEAVY_HITTERS_TOP_N", "100")),
+            support=float(os.getenv("HEAVY_HITTERS_SUPPORT", "0.001")),
+            epsilon=float(os.getenv("HEAVY_HITTERS_EPSILON", "0.0001")),
+            confidence=float(os.getenv("HEAVY_HITTERS_CONFIDENCE", "0.99")),
+            seed=int(os.getenv("HEAVY_HITTERS_SEED", "42"))
+        )
+
+    @property
+    def sketch_bytes(self) -> int:
+        """Taille du count-min sketch: largeur ceil(2/eps) x profondeur ceil(-log2(1-confidence))"""
+        width = math.ceil(2 / self.epsilon)
+        depth = math.ceil(-math.log(1 - self.confidence) / math.log(2))
+        return width * depth * 8
+
+    def describe(self) -> str:
+        return (f"top {self.top_n}, support={self.support}, epsilon={self.epsilon}, "
+                f"confidence={self.confidence}, sketch ~{self.sketch_bytes / 1024:.0f} KB")
+
+    def analyze(self, df: DataFrame, metrics: Dict) -> DataFrame:
+        """Calculer le top-N (customer_id, total_orders, avg_amount) et renseigner la précision atteinte"""
+        spark = df.sparkSession
+
+        # Un seul passage agrégé: le sketch est fusionné entre partitions, seul lui transite
+        cms_expr = f"count_min_sketch(customer_id, {self.epsilon}D, {self.confidence}D, {self.seed})"
+        row = df.agg(expr(cms_expr).alias("cms")).first()
+        sketch = spark._jvm.org.apache.spark.util.sketch.CountMinSketch.readFrom(bytearray(row["cms"]))
+        total = sketch.totalCount()
+
+        # Candidats: tout client au-delà de support * total est garanti présent (faux positifs possibles)
+        candidates = df.freqItems(["customer_id"], self.support).first()[0] or []
+
+        # Le count-min ne sous-estime jamais: un candidat estimé sous le seuil peut être écarté
+        estimates = {c: sketch.estimateCount(c) for c in candidates if c is not None}
+        retained = {c: e for c, e in estimates.items() if e > self.min_orders}
+
+        # Comptages exacts sur les seuls candidats; top-N borné (TakeOrderedAndProject) au lieu d'un tri global
+        result = df.filter(col("customer_id").isin(list(retained))) \
+                   .groupBy("customer_id") \
+                   .agg(
+                       count("*").alias("total_orders"),
+                       avg("amount").alias("avg_amount")
+                   ) \
+                   .filter(col("total_orders") > self.min_orders) \
+                   .orderBy(col("total_orders").desc(), col("customer_id")) \
+                   .limit(self.top_n)
+        top = result.collect()
+
+        # Précision atteinte: erreur observée du sketch sur le top-N, comparée à la borne théorique
+        errors = [estimates[r["customer_id"]] - r["total_orders"] for r in top]
+        bound = self.epsilon * total
+        support_threshold = self.support * total
+        # Plus petit comptage pouvant figurer dans le résultat
+        floor = top[-1]["total_orders"] if len(top) == self.top_n else self.min_orders + 1
+        metrics["approx"] = {
+            'total_orders': total,
+            'candidates': len(candidates),
+            'refined': len(retained),
+            'top_n': self.top_n,
+            'epsilon': self.epsilon,
+            'confidence': self.confidence,
+            'error_bound': round(bound, 1),
+            'max_error': max(errors) if errors else 0,
+            'mean_error': round(sum(errors) / len(errors), 2) if errors else 0.0,
+            'within_bound': round(sum(e <= bound for e in errors) / len(errors), 4) if errors else 1.0,
+            'support_threshold': round(support_threshold, 1),
+            # Tout client éligible au top-N dépasse alors le seuil de support, donc est candidat
+            'top_n_exact': floor > support_threshold,
+            'sketch_bytes': self.sketch_bytes
+        }
+        logger.info(f"≈ Heavy hitters: {len(top)} clients sur {len(candidates)} candidats, "
+                    f"erreur max {metrics['approx']['max_error']} (borne {bound:.0f} à {self.confidence:.0%}), "
+                    f"top-N exact: {metrics['approx']['top_n_exact']}")
+
+        # Le résultat (au plus N lignes) est déjà sur le driver
+        return spark.createDataFrame(top, result.schema)
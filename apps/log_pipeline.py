@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Journalisation asynchrone du job Spark Failover
+Les appels de log déposent l'enregistrement dans une file; un thread dédié écrit fichier et stdout
+"""
+
+import os
+import sys
+import copy
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import List
+
+TEXT_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Un objet JSON par ligne; les caractères non ASCII sont conservés pour le monitor"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 3),
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Trace déjà rendue par DroppingQueueHandler.prepare
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SizeAndTimeRotatingFileHandler(RotatingFileHandler):
+    """Rotation dès que la taille maximale est atteinte ou que l'intervalle est écoulé"""
+
+    def __init__(self, filename: str, max_bytes: int = 0, backup_count: int = 5, interval: float = 0):
+        super().__init__(filename, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        self.interval = interval
+        self.rollover_at = time.time() + interval if interval else None
+
+    def shouldRollover(self, record: logging.LogRecord) -> int:
+        if self.rollover_at is not None and time.time() >= self.rollover_at:
+            return 1
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        super().doRollover()
+        if self.interval:
+            self.rollover_at = time.time() + self.interval
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Ne bloque jamais l'appelant: si la file est pleine, l'enregistrement est compté puis abandonné"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Message résolu et trace rendue à part (exc_text), sans l'objet traceback
+
+        Le QueueHandler standard fusionne la trace dans le message, hors de portée du champ `exc` JSON
+        """
+        record = copy.copy(record)
+        message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message = message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """File + thread d'écriture; stop() vide la file puis rebranche les handlers en direct"""
+
+    def __init__(self, handlers: List[logging.Handler], queue_size: int = 10000, level: int = logging.INFO):
+        self.handlers = handlers
+        self.level = level
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.lock = threading.Lock()
+        self.running = False
+
+    def start(self):
+        root = logging.getLogger()
+        root.setLevel(self.level)
+        root.addHandler(self.queue_handler)
+        self.listener.start()
+        self.running = True
+        atexit.register(self.stop)
+
+    def stop(self):
+        """Vider la file et arrêter le thread; les logs suivants (arrêt du job) restent synchrones"""
+        with self.lock:
+            if not self.running:
+                return
+            self.running = False
+            root = logging.getLogger()
+            root.removeHandler(self.queue_handler)
+            self.listener.stop()
+            for handler in self.handlers:
+                root.addHandler(handler)
+                handler.flush()
+        if self.queue_handler.dropped:
+            logging.getLogger(__name__).warning(
+                f"⚠ {self.queue_handler.dropped} enregistrement(s) de log abandonné(s), file pleine")
+
+
+def start_logging(path: str) -> LogPipeline:
+    """Configurer la journalisation asynchrone à partir des variables d'environnement"""
+    json_lines = os.getenv("LOG_FORMAT", "text").lower() == "json"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    file_handler = SizeAndTimeRotatingFileHandler(
+        path,
+        max_bytes=int(float(os.getenv("LOG_MAX_MB", "50")) * 1024 * 1024),
+        backup_count=int(os.getenv("LOG_BACKUPS", "5")),
+        interval=float(os.getenv("LOG_ROTATE_HOURS", "24")) * 3600
+    )
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(TEXT_FORMAT))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    pipeline = LogPipeline([file_handler, stream_handler], queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    pipeline.start()
+    return pipeline
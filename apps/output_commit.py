@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Commit atomique et versionné des résultats du POC Spark Failover
+Écriture dans un répertoire de staging, bascule atomique du pointeur _current, rétention des N dernières versions
+"""
+
+import os
+import json
+import shutil
+import hashlib
+import logging
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+from pyspark import StorageLevel
+from pyspark.sql import DataFrame
+from pyspark.sql.functions import bit_xor, coalesce, col, count, hash as spark_hash, lit, sum as spark_sum, xxhash64
+
+from storage import StorageFormat
+
+logger = logging.getLogger(__name__)
+
+POINTER_NAME = "_current"
+STAGING_DIR = "_staging"
+VERSION_PREFIX = "v-"
+
+
+def read_pointer(root: str) -> Optional[Dict]:
+    """Version courante d'un résultat (None si aucune version committée)"""
+    try:
+        with open(os.path.join(root, POINTER_NAME), 'r') as f:
+            pointer = json.load(f)
+        return pointer if isinstance(pointer, dict) and 'version' in pointer else None
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Pointeur illisible ignoré ({root}): {e}")
+        return None
+
+
+def current_path(root: str) -> Optional[str]:
+    """Répertoire de la version courante, à lire à la place de la racine"""
+    pointer = read_pointer(root)
+    return os.path.join(root, pointer['path']) if pointer else None
+
+
+def fingerprint(df: DataFrame) -> Dict:
+    """Empreinte du contenu, indépendante de l'ordre des lignes et du partitionnement"""
+    # Deux hachages indépendants: la somme distingue les doublons, le xor les permutations de valeurs
+    columns = [col(c) for c in df.columns]
+    row = df.agg(
+        count(lit(1)).alias("rows"),
+        coalesce(spark_sum(spark_hash(*columns).cast("long")), lit(0)).alias("hash_sum"),
+        coalesce(bit_xor(xxhash64(*columns)), lit(0)).alias("hash_xor")
+    ).first()
+    digest = hashlib.sha256(
+        f"{df.schema.json()}|{row['rows']}|{row['hash_sum']}|{row['hash_xor']}".encode()
+    ).hexdigest()[:16]
+    return {'rows': row['rows'], 'fingerprint': digest}
+
+
+class VersionedOutput:
+    """Un résultat versionné: <racine>/v-000042, pointé par <racine>/_current"""
+
+    def __init__(self, root: str, keep: int = 3):
+        if keep < 1:
+            raise ValueError("keep doit être >= 1")
+        self.root = root
+        self.keep = keep
+
+    @classmethod
+    def from_env(cls, root: str) -> 'VersionedOutput':
+        return cls(root, keep=int(os.getenv("OUTPUT_KEEP_VERSIONS", "3")))
+
+    @property
+    def pointer(self) -> Optional[Dict]:
+        return read_pointer(self.root)
+
+    def _write_pointer(self, pointer: Dict):
+        """Bascule atomique: les lecteurs voient l'ancienne ou la nouvelle version, jamais un mélange"""
+        path = os.path.join(self.root, POINTER_NAME)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(pointer, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _versions(self):
+        try:
+            entries = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted(e for e in entries if e.startswith(VERSION_PREFIX))
+
+    def _prune(self, current: str):
+        """Conserver les `keep` dernières versions, dont toujours la courante"""
+        versions = [v for v in self._versions() if v != current]
+        for version in versions[:max(0, len(versions) - (self.keep - 1))]:
+            shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+            logger.info(f"🗑 Version {version} supprimée ({self.root})")
+
+    def commit(self, df: DataFrame, storage: StorageFormat,
+               before_write: Optional[Callable[[DataFrame], DataFrame]] = None) -> Dict:
+        """Écrire une nouvelle version si le contenu a changé; retourne les métriques du commit
+
+        `before_write` transforme le DataFrame réellement écrit dans le staging, après l'empreinte
+        (point d'injection de pannes pendant l'écriture)
+        """
+        previous = self.pointer
+
+        # Le résultat est calculé une fois: l'empreinte puis l'écriture relisent le cache
+        df = df.persist(StorageLevel.MEMORY_AND_DISK)
+        try:
+            content = fingerprint(df)
+            if previous and previous.get('fingerprint') == content['fingerprint']:
+                logger.info(f"= Résultat inchangé ({content['fingerprint']}), écriture évitée: {self.root}")
+                return {**content, 'version': previous['version'], 'skipped': True}
+
+            version = (previous['version'] if previous else 0) + 1
+            name = f"{VERSION_PREFIX}{version:06d}"
+            staging = os.path.join(self.root, STAGING_DIR, name)
+
+            # Un staging laissé par une tentative interrompue est repris de zéro
+            shutil.rmtree(os.path.join(self.root, STAGING_DIR), ignore_errors=True)
+            storage.write(before_write(df) if before_write else df, staging)
+
+            # Version orpheline d'un commit interrompu avant la bascule du pointeur
+            target = os.path.join(self.root, name)
+            shutil.rmtree(target, ignore_errors=True)
+            os.replace(staging, target)
+        finally:
+            df.unpersist()
+
+        self._write_pointer({
+            'version': version,
+            'path': name,
+            'fingerprint': content['fingerprint'],
+            'rows': content['rows'],
+            'format': storage.format,
+            'committed_at': datetime.now().isoformat()
+        })
+        shutil.rmtree(os.path.join(self.root, STAGING_DIR), ignore_errors=True)
+        self._prune(name)
+        logger.info(f"✓ Version {name} committée ({self.root})")
+        return {**content, 'version': version, 'skipped': False}
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Ordonnancement des cycles du job Spark Failover
+Déclenchement sur nouveaux fichiers, cadence fixe compensée ou intervalle, et politiques de backoff
+"""
+
+import os
+import abc
+import math
+import time
+import random
+import logging
+import threading
+from typing import Dict, Optional
+
+from watchdog.events import FileSystemEventHandler
+from watchdog.observers import Observer
+
+logger = logging.getLogger(__name__)
+
+
+# --- Politiques de backoff ------------------------------------------------
+
+class BackoffPolicy(abc.ABC):
+    """Attente avant la tentative `attempt` (à partir de 1)"""
+
+    def __init__(self, base: float = 1.0, cap: float = 60.0, jitter: str = "none", seed: Optional[int] = None):
+        if jitter not in ("none", "full", "equal"):
+            raise ValueError(f"Jitter inconnu: {jitter}")
+        self.base = base
+        self.cap = cap
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+
+    @abc.abstractmethod
+    def raw_delay(self, attempt: int) -> float:
+        """Attente avant plafond et jitter"""
+
+    def delay(self, attempt: int) -> float:
+        raw = min(self.raw_delay(attempt), self.cap)
+        if self.jitter == "full":
+            raw = self.rng.uniform(0, raw)
+        elif self.jitter == "equal":
+            raw = raw / 2 + self.rng.uniform(0, raw / 2)
+        return round(raw, 3)
+
+    def describe(self) -> str:
+        return f"{type(self).__name__}(base={self.base}s, cap={self.cap}s, jitter={self.jitter})"
+
+
+class ConstantBackoff(BackoffPolicy):
+    def raw_delay(self, attempt: int) -> float:
+        return self.base
+
+
+class LinearBackoff(BackoffPolicy):
+    def raw_delay(self, attempt: int) -> float:
+        return self.base * attempt
+
+
+class ExponentialBackoff(BackoffPolicy):
+    """base ** attempt; comportement historique avec base=2, cap=60 et sans jitter"""
+
+    def raw_delay(self, attempt: int) -> float:
+        # Plafonner l'exposant évite un débordement sur les longues séries d'échecs
+        return self.base ** min(attempt, 64)
+
+
+class DecorrelatedBackoff(BackoffPolicy):
+    """Jitter décorrélé: l'attente dépend de la précédente, pas du numéro de tentative"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.previous = self.base
+
+    def raw_delay(self, attempt: int) -> float:
+        if attempt <= 1:
+            self.previous = self.base
+        self.previous = self.rng.uniform(self.base, self.previous * 3)
+        return self.previous
+
+    def delay(self, attempt: int) -> float:
+        # Le tirage fait déjà office de jitter
+        return round(min(self.raw_delay(attempt), self.cap), 3)
+
+
+BACKOFF_POLICIES = {
+    'constant': ConstantBackoff,
+    'linear': LinearBackoff,
+    'exponential': ExponentialBackoff,
+    'decorrelated': DecorrelatedBackoff,
+}
+
+
+def backoff_from_env() -> BackoffPolicy:
+    name = os.getenv("RESTART_BACKOFF", "exponential")
+    if name not in BACKOFF_POLICIES:
+        raise ValueError(f"Politique de backoff inconnue: {name}")
+    seed = os.getenv("RESTART_BACKOFF_SEED")
+    return BACKOFF_POLICIES[name](
+        base=float(os.getenv("RESTART_BACKOFF_BASE", "2")),
+        cap=float(os.getenv("RESTART_BACKOFF_CAP", "60")),
+        jitter=os.getenv("RESTART_BACKOFF_JITTER", "equal"),
+        seed=int(seed) if seed else None
+    )
+
+
+# --- Déclenchement sur fichiers --------------------------------------------
+
+class _InputFilesHandler(FileSystemEventHandler):
+    """Transmet les fichiers de données finalisés, en ignorant les fichiers temporaires de Spark"""
+
+    def __init__(self, scheduler: 'CycleScheduler'):
+        self.scheduler = scheduler
+
+    def _accept(self, path: str) -> bool:
+        relative = os.path.relpath(path, self.scheduler.watch_path)
+        # _temporary, _SUCCESS, .crc...: écritures en cours ou métadonnées
+        return not any(part.startswith(('_', '.')) for part in relative.split(os.sep))
+
+    def on_created(self, event):
+        if not event.is_directory and self._accept(event.src_path):
+            self.scheduler.notify(event.src_path)
+
+    def on_moved(self, event):
+        # Le committer de Spark renomme les fichiers depuis _temporary
+        if not event.is_directory and self._accept(event.dest_path):
+            self.scheduler.notify(event.dest_path)
+
+
+# --- Ordonnanceur -----------------------------------------------------------
+
+class CycleScheduler:
+    """Décide du démarrage du prochain cycle et mesure le retard de chaque cycle"""
+
+    MODES = ('interval', 'fixed_rate', 'files')
+
+    def __init__(self,
+                 mode: str = "interval",
+                 period: float = 30.0,
+                 watch_path: Optional[str] = None,
+                 debounce: float = 2.0,
+                 max_batch_wait: float = 30.0,
+                 max_idle: float = 300.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode d'ordonnancement inconnu: {mode}")
+        if mode == "files" and not watch_path:
+            raise ValueError("Le mode files nécessite un répertoire surveillé")
+        self.mode = mode
+        self.period = period
+        self.watch_path = watch_path
+        self.debounce = debounce
+        self.max_batch_wait = max_batch_wait
+        self.max_idle = max_idle
+
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.observer: Optional[Observer] = None
+
+        # Fichiers arrivés depuis le dernier cycle: chemin -> horodatage d'arrivée
+        self.pending: Dict[str, float] = {}
+        self.last_event: Optional[float] = None
+        self.in_cycle = False
+
+        # Échéance du prochain cycle (horloge monotone) et informations de déclenchement
+        self.next_run: Optional[float] = None
+        self.last_start: Optional[float] = None
+        self.trigger = {'trigger': 'startup', 'skipped_ticks': 0}
+        self.metrics = {
+            'cycles': 0,
+            'skipped_ticks': 0,
+            'arrivals_during_cycle': 0,
+            'last_schedule_lag_s': None,
+            'last_data_lag_s': None
+        }
+
+    @classmethod
+    def from_env(cls, watch_path: str) -> 'CycleScheduler':
+        return cls(
+            mode=os.getenv("SCHEDULE_MODE", "interval"),
+            period=float(os.getenv("SCHEDULE_PERIOD", "30")),
+            watch_path=watch_path,
+            debounce=float(os.getenv("SCHEDULE_DEBOUNCE", "2")),
+            max_batch_wait=float(os.getenv("SCHEDULE_MAX_BATCH_WAIT", "30")),
+            max_idle=float(os.getenv("SCHEDULE_MAX_IDLE", "300"))
+        )
+
+    def describe(self) -> str:
+        if self.mode == "files":
+            return (f"files ({self.watch_path}, debounce={self.debounce}s, "
+                    f"lot max={self.max_batch_wait}s, inactivité max={self.max_idle}s)")
+        return f"{self.mode} (période={self.period}s)"
+
+    # --- Cycle de vie -----------------------------------------------------
+
+    def start(self):
+        if self.mode != "files" or self.observer is not None:
+            return
+        os.makedirs(self.watch_path, exist_ok=True)
+        self.observer = Observer()
+        self.observer.schedule(_InputFilesHandler(self), self.watch_path, recursive=True)
+        self.observer.daemon = True
+        self.observer.start()
+        logger.info(f"👀 Surveillance de {self.watch_path}")
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer = None
+
+    def notify(self, path: str):
+        """Nouveau fichier de données (thread watchdog)"""
+        with self.condition:
+            if self.in_cycle:
+                # Arrivée externe pendant un cycle: gardée pour déclencher le suivant dès sa fin
+                self.metrics['arrivals_during_cycle'] += 1
+            self.pending.setdefault(path, time.time())
+            self.last_event = time.monotonic()
+            self.condition.notify_all()
+
+    def sleep(self, seconds: float) -> bool:
+        """Attente interruptible par stop(); retourne False si l'ordonnanceur est arrêté"""
+        deadline = time.monotonic() + seconds
+        with self.condition:
+            while not self.stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return not self.stopped
+
+    # --- Mesure des cycles --------------------------------------------------
+
+    def begin_cycle(self) -> Dict:
+        """Début effectif d'un cycle: retard par rapport à l'échéance et aux données"""
+        now = time.monotonic()
+        wall = time.time()
+        with self.condition:
+            files = dict(self.pending)
+            self.pending.clear()
+            self.in_cycle = True
+
+        if self.mode == "fixed_rate" and self.next_run is None:
+            # Première exécution: elle fixe la grille des échéances
+            self.next_run = now
+
+        lag = {
+            'trigger': self.trigger['trigger'],
+            'schedule_lag_s': round(now - self.next_run, 3) if self.next_run is not None else None,
+            'period_s': round(now - self.last_start, 3) if self.last_start is not None else None,
+            'skipped_ticks': self.trigger['skipped_ticks'],
+            'files': len(files),
+            'data_lag_s': round(wall - min(files.values()), 3) if files else None
+        }
+        self.last_start = now
+        # Sans passage par wait_next, le cycle suivant est une nouvelle tentative
+        self.trigger = {'trigger': 'retry', 'skipped_ticks': 0}
+        self.metrics['cycles'] += 1
+        self.metrics['last_schedule_lag_s'] = lag['schedule_lag_s']
+        self.metrics['last_data_lag_s'] = lag['data_lag_s']
+        return lag
+
+    def end_cycle(self):
+        with self.condition:
+            self.in_cycle = False
+
+    # --- Attente du prochain cycle -----------------------------------------
+
+    def wait_next(self) -> bool:
+        """Bloquer jusqu'au prochain cycle; retourne False si l'ordonnanceur est arrêté"""
+        if self.mode == "fixed_rate":
+            return self._wait_fixed_rate()
+        if self.mode == "files":
+            return self._wait_files()
+
+        self.next_run = time.monotonic() + self.period
+        self.trigger = {'trigger': 'interval', 'skipped_ticks': 0}
+        return self.sleep(self.period)
+
+    def _wait_fixed_rate(self) -> bool:
+        """Échéances sur une grille fixe: la durée du cycle ne décale pas la cadence"""
+        self.next_run += self.period
+        now = time.monotonic()
+        skipped = 0
+        if now > self.next_run:
+            # Cycle plus long que la période: pas de rattrapage en rafale ni de chevauchement,
+            # on repart sur la dernière échéance de la grille
+            skipped = math.floor((now - self.next_run) / self.period)
+            self.next_run += skipped * self.period
+            if skipped:
+                self.metrics['skipped_ticks'] += skipped
+                logger.warning(f"⏩ Cycle plus long que la période, {skipped} échéance(s) sautée(s)")
+        self.trigger = {'trigger': 'tick', 'skipped_ticks': skipped}
+        return self.sleep(self.next_run - now)
+
+    def _wait_files(self) -> bool:
+        """Attendre de nouveaux fichiers, puis regrouper les arrivées proches en un seul cycle"""
+        idle_deadline = time.monotonic() + self.max_idle
+        with self.condition:
+            while not self.stopped and not self.pending:
+                remaining = idle_deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            if self.stopped:
+                return False
+
+            if not self.pending:
+                # Aucun fichier: cycle quand même, pour vérifier la santé de la session
+                self.next_run = idle_deadline
+                self.trigger = {'trigger': 'idle', 'skipped_ticks': 0}
+                return True
+
+            # Debounce: attendre un silence de `debounce` s, sans dépasser `max_batch_wait`
+            first = time.monotonic()
+            batch_deadline = first + self.max_batch_wait
+            while not self.stopped:
+                wake_at = min(self.last_event + self.debounce, batch_deadline)
+                remaining = wake_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            self.next_run = first
+            self.trigger = {'trigger': 'files', 'skipped_ticks': 0}
+            return not self.stopped
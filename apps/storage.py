@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Formats de stockage des entrées et résultats du POC Spark Failover
+CSV (historique), Parquet ou ORC avec compression et partitionnement
+"""
+
+import os
+import logging
+from typing import List, Optional
+
+from pyspark.sql import SparkSession, DataFrame
+from pyspark.sql.types import StructType
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FORMATS = ('csv', 'parquet', 'orc')
+
+DEFAULT_COMPRESSION = {
+    'csv': 'none',
+    'parquet': 'snappy',
+    'orc': 'snappy'
+}
+
+
+class StorageFormat:
+    """Écriture et lecture d'un dataset dans le format configuré"""
+
+    def __init__(self,
+                 fmt: str = 'csv',
+                 compression: Optional[str] = None,
+                 partition_by: Optional[List[str]] = None,
+                 target_file_mb: int = 0,
+                 row_bytes: int = 64):
+        fmt = fmt.lower()
+        if fmt not in SUPPORTED_FORMATS:
+            raise ValueError(f"Format non supporté: {fmt} (attendu: {', '.join(SUPPORTED_FORMATS)})")
+        if target_file_mb < 0 or row_bytes <= 0:
+            raise ValueError("target_file_mb doit être >= 0 et row_bytes > 0")
+
+        self.format = fmt
+        self.compression = compression or DEFAULT_COMPRESSION[fmt]
+        self.partition_by = partition_by or []
+        self.target_file_mb = target_file_mb
+        self.row_bytes = row_bytes
+
+    @classmethod
+    def from_env(cls) -> 'StorageFormat':
+        """Construire le format à partir des variables d'environnement"""
+        partition_by = os.getenv("OUTPUT_PARTITION_BY", "")
+        return cls(
+            fmt=os.getenv("OUTPUT_FORMAT", "csv"),
+            compression=os.getenv("OUTPUT_COMPRESSION") or None,
+            partition_by=[c.strip() for c in partition_by.split(',') if c.strip()],
+            target_file_mb=int(os.getenv("OUTPUT_TARGET_FILE_MB", "0")),
+            row_bytes=int(os.getenv("OUTPUT_ROW_BYTES", "64"))
+        )
+
+    @property
+    def max_records_per_file(self) -> int:
+        """Nombre de lignes par fichier approchant la taille cible (0 = illimité)"""
+        if not self.target_file_mb:
+            return 0
+        return max(1, (self.target_file_mb * 1024 * 1024) // self.row_bytes)
+
+    def write(self, df: DataFrame, path: str, partitioned: bool = False, mode: str = "overwrite"):
+        """Écrire un DataFrame; le partitionnement ne s'applique qu'aux datasets volumineux"""
+        writer = df.write.mode(mode).format(self.format).option("compression", self.compression)
+
+        if self.format == 'csv':
+            writer = writer.option("header", "true")
+
+        if self.max_records_per_file:
+            writer = writer.option("maxRecordsPerFile", self.max_records_per_file)
+
+        if partitioned and self.partition_by:
+            missing = [c for c in self.partition_by if c not in df.columns]
+            if missing:
+                raise ValueError(f"Colonnes de partitionnement absentes: {missing}")
+            writer = writer.partitionBy(*self.partition_by)
+
+        writer.save(path)
+
+    def read(self, spark: SparkSession, path: str, schema: Optional[StructType] = None) -> DataFrame:
+        """Relire un dataset; Parquet/ORC profitent du pruning de colonnes et du pushdown"""
+        reader = spark.read.format(self.format)
+
+        if self.format == 'csv':
+            reader = reader.option("header", "true")
+
+        if schema is not None:
+            # Les colonnes de partition sont reconstruites depuis l'arborescence
+            reader = reader.schema(schema)
+
+        return reader.load(path)
+
+    def describe(self) -> str:
+        partitions = ','.join(self.partition_by) or 'aucun'
+        return (f"format={self.format}, compression={self.compression}, "
+                f"partitionnement={partitions}, lignes/fichier={self.max_records_per_file or 'illimité'}")
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Mode Structured Streaming du POC Spark Failover
+Maintient les analyses par catégorie et par client de façon incrémentale
+"""
+
+import os
+import logging
+from typing import Dict, List, Optional
+
+from pyspark.sql import SparkSession, DataFrame
+from pyspark.sql.functions import col, count, avg, max as spark_max, window
+from pyspark.sql.streaming import StreamingQuery
+
+from data_generator import ORDERS_SCHEMA
+from storage import StorageFormat
+from output_commit import VersionedOutput
+
+logger = logging.getLogger(__name__)
+
+
+class StreamingAnalyses:
+    """Requêtes de streaming sur le répertoire des commandes, reprises depuis leur checkpoint"""
+
+    def __init__(self,
+                 storage: StorageFormat,
+                 source_path: str,
+                 outputs: Dict[str, str],
+                 checkpoint_dir: str,
+                 trigger: str = "30 seconds",
+                 watermark: str = "10 minutes",
+                 window_duration: Optional[str] = None,
+                 max_files_per_trigger: Optional[int] = None):
+        self.storage = storage
+        self.source_path = source_path
+        self.outputs = outputs
+        self.checkpoint_dir = checkpoint_dir
+        self.trigger = trigger
+        self.watermark = watermark
+        self.window_duration = window_duration
+        self.max_files_per_trigger = max_files_per_trigger
+        self.queries: List[StreamingQuery] = []
+
+    @classmethod
+    def from_env(cls, storage: StorageFormat, source_path: str,
+                 outputs: Dict[str, str], checkpoint_dir: str) -> 'StreamingAnalyses':
+        """Construire le mode streaming à partir des variables d'environnement"""
+        max_files = os.getenv("STREAM_MAX_FILES_PER_TRIGGER")
+        return cls(
+            storage=storage,
+            source_path=source_path,
+            outputs=outputs,
+            checkpoint_dir=os.path.join(checkpoint_dir, "streaming"),
+            trigger=os.getenv("STREAM_TRIGGER", "30 seconds"),
+            watermark=os.getenv("STREAM_WATERMARK", "10 minutes"),
+            window_duration=os.getenv("STREAM_WINDOW") or None,
+            max_files_per_trigger=int(max_files) if max_files else None
+        )
+
+    @property
+    def available_now(self) -> bool:
+        """Trigger availableNow: chaque démarrage traite les nouveaux fichiers puis s'arrête"""
+        return self.trigger.lower() in ("availablenow", "available_now")
+
+    @property
+    def windowed(self) -> bool:
+        return self.window_duration is not None
+
+    def read_orders(self, spark: SparkSession) -> DataFrame:
+        """Source fichier: seuls les fichiers nouveaux sont lus à chaque micro-batch"""
+        reader = spark.readStream.format(self.storage.format).schema(ORDERS_SCHEMA)
+        if self.storage.format == 'csv':
+            reader = reader.option("header", "true")
+        if self.max_files_per_trigger:
+            reader = reader.option("maxFilesPerTrigger", self.max_files_per_trigger)
+        return reader.load(self.source_path).withWatermark("timestamp", self.watermark)
+
+    def _keys(self, key: str) -> list:
+        """Clés de regroupement; la fenêtre permet d'évincer l'état sous le watermark"""
+        if self.windowed:
+            return [window(col("timestamp"), self.window_duration), col(key)]
+        return [col(key)]
+
+    def _flatten_window(self, analysis: DataFrame) -> DataFrame:
+        """Aplatir la colonne window (struct) pour les formats qui ne la supportent pas"""
+        columns = [c for c in analysis.columns if c != "window"]
+        return analysis.select(
+            col("window.start").alias("window_start"),
+            col("window.end").alias("window_end"),
+            *columns
+        )
+
+    def category_analysis(self, orders: DataFrame) -> DataFrame:
+        analysis = orders.groupBy(*self._keys("product_category")) \
+                         .agg(
+                             count("*").alias("total_orders"),
+                             avg("amount").alias("avg_amount"),
+                             spark_max("amount").alias("max_amount")
+                         )
+        if self.windowed:
+            return self._flatten_window(analysis)
+        return analysis.orderBy("total_orders", ascending=False)
+
+    def customer_analysis(self, orders: DataFrame) -> DataFrame:
+        analysis = orders.groupBy(*self._keys("customer_id")) \
+                         .agg(
+                             count("*").alias("total_orders"),
+                             avg("amount").alias("avg_amount")
+                         ) \
+                         .filter(col("total_orders") > 5)
+        if self.windowed:
+            return self._flatten_window(analysis)
+        return analysis.orderBy("total_orders", ascending=False)
+
+    def _batch_writer(self, name: str, path: str):
+        """Écriture idempotente d'un micro-batch: un batch déjà committé n'est pas réécrit"""
+        marker = os.path.join(self.checkpoint_dir, name, "last_committed_batch")
+        output = VersionedOutput.from_env(path)
+
+        def write_batch(batch_df: DataFrame, batch_id: int):
+            try:
+                with open(marker, 'r') as f:
+                    if batch_id <= int(f.read().strip()):
+                        logger.info(f"↷ {name}: batch {batch_id} déjà committé")
+                        return
+            except (OSError, ValueError):
+                pass
+
+            # En mode complete, chaque batch contient la table de résultats entière:
+            # nouvelle version, ou aucune écriture si les agrégats n'ont pas changé
+            output.commit(batch_df, self.storage)
+
+            tmp_marker = f"{marker}.tmp"
+            with open(tmp_marker, 'w') as f:
+                f.write(str(batch_id))
+            os.replace(tmp_marker, marker)
+
+        return write_batch
+
+    def _start_query(self, name: str, analysis: DataFrame) -> StreamingQuery:
+        path = self.outputs[name]
+        checkpoint = os.path.join(self.checkpoint_dir, name)
+        os.makedirs(checkpoint, exist_ok=True)
+
+        writer = analysis.writeStream \
+                         .queryName(name) \
+                         .option("checkpointLocation", checkpoint)
+
+        if self.available_now:
+            writer = writer.trigger(availableNow=True)
+        else:
+            writer = writer.trigger(processingTime=self.trigger)
+
+        if self.windowed:
+            # Fenêtres finalisées par le watermark: sink fichier exactly-once natif
+            writer = writer.outputMode("append") \
+                           .format(self.storage.format) \
+                           .option("path", path) \
+                           .option("compression", self.storage.compression)
+            if self.storage.format == 'csv':
+                writer = writer.option("header", "true")
+        else:
+            writer = writer.outputMode("complete").foreachBatch(self._batch_writer(name, path))
+
+        return writer.start()
+
+    def start(self, spark: SparkSession):
+        """Démarrer (ou reprendre depuis le checkpoint) les deux requêtes"""
+        self.stop()
+        orders = self.read_orders(spark)
+        self.queries = [
+            self._start_query("category_analysis", self.category_analysis(orders)),
+            self._start_query("customer_analysis", self.customer_analysis(orders))
+        ]
+        logger.info(f"✓ Streaming démarré (trigger={self.trigger}, watermark={self.watermark}, "
+                    f"fenêtre={self.window_duration or 'aucune'})")
+
+    def is_active(self) -> bool:
+        return bool(self.queries) and all(q.isActive for q in self.queries)
+
+    def check(self):
+        """Remonter l'exception d'une requête arrêtée en erreur"""
+        for query in self.queries:
+            error = query.exception()
+            if error is not None:
+                raise error
+            if not query.isActive and not self.available_now:
+                raise RuntimeError(f"Requête de streaming {query.name} arrêtée")
+
+    def progress(self) -> Dict[str, Optional[dict]]:
+        """Dernière progression de chaque requête"""
+        return {q.name: q.lastProgress for q in self.queries}
+
+    def stop(self):
+        """Arrêter les requêtes; l'état reste dans le checkpoint"""
+        for query in self.queries:
+            try:
+                query.stop()
+            except Exception as e:
+                logger.error(f"✗ Erreur arrêt requête {query.name}: {e}")
+        self.queries = []
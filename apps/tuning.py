@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Réglage automatique de la configuration SparkSession pour le POC Spark Failover
+Ressources lues sur le master (/json), volumes lus dans l'historique des cycles, valeurs épinglables
+"""
+
+import os
+import re
+import json
+import math
+import time
+import logging
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+# Bornes des décisions
+MAX_EXECUTOR_CORES = 5
+MIN_EXECUTOR_MEMORY_MB = 512
+EXECUTOR_MEMORY_FRACTION = 0.9
+MAX_ADVISORY_BYTES = 64 * MB
+MIN_ADVISORY_BYTES = 1 * MB
+PARTITIONS_PER_CORE = 3
+BROADCAST_MEMORY_FRACTION = 0.04
+MIN_BROADCAST_BYTES = 4 * MB
+MAX_BROADCAST_BYTES = 256 * MB
+
+
+def parse_pins(spec: str) -> Dict[str, str]:
+    """Parser 'clé=valeur,clé=valeur' (clés de configuration Spark)"""
+    pins = {}
+    for item in spec.split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        pins[key.strip()] = value.strip()
+    return pins
+
+
+def directory_size(path: str) -> int:
+    """Taille des fichiers de données d'un répertoire (hors _temporary, _SUCCESS, .crc)"""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        dirs[:] = [d for d in dirs if not d.startswith(('_', '.'))]
+        for name in files:
+            if not name.startswith(('_', '.')):
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+    return total
+
+
+def master_ui_url(master_url: str) -> Optional[str]:
+    """spark://hote:7077 -> http://hote:8080"""
+    match = re.match(r"spark://([^:/,]+)", master_url)
+    return f"http://{match.group(1)}:8080" if match else None
+
+
+class SessionTuner:
+    """Choisit partitions de shuffle, taille cible, ressources des executors et seuil de broadcast"""
+
+    def __init__(self,
+                 master_url: str = "local[*]",
+                 ui_url: Optional[str] = None,
+                 history_path: str = "/data/checkpoints/tuning_history.json",
+                 history_size: int = 20,
+                 pins: Optional[Dict[str, str]] = None,
+                 enabled: bool = True,
+                 timeout: float = 5.0):
+        self.master_url = master_url
+        self.ui_url = ui_url or master_ui_url(master_url)
+        self.history_path = history_path
+        self.history_size = history_size
+        self.pins = pins or {}
+        self.enabled = enabled
+        self.timeout = timeout
+        self.decisions: Dict[str, Dict] = {}
+
+    @classmethod
+    def from_env(cls, checkpoint_dir: str) -> 'SessionTuner':
+        return cls(
+            master_url=os.getenv("SPARK_MASTER_URL", "local[*]"),
+            ui_url=os.getenv("SPARK_MASTER_UI_URL") or None,
+            history_path=os.path.join(checkpoint_dir, "tuning_history.json"),
+            history_size=int(os.getenv("TUNER_HISTORY_SIZE", "20")),
+            pins=parse_pins(os.getenv("TUNER_PINS", "")),
+            enabled=os.getenv("TUNER_ENABLED", "true").lower() == "true"
+        )
+
+    # --- Entrées -----------------------------------------------------------
+
+    def cluster_resources(self) -> Optional[Dict]:
+        """Cores et mémoire des workers vivants (cluster standalone) ou de la machine (mode local)"""
+        if self.master_url.startswith("local"):
+            match = re.match(r"local\[(\d+)", self.master_url)
+            cores = int(match.group(1)) if match else os.cpu_count() or 1
+            return {'source': 'local', 'cores': cores, 'workers': []}
+        if not self.ui_url:
+            return None
+        try:
+            with urllib.request.urlopen(f"{self.ui_url}/json", timeout=self.timeout) as response:
+                data = json.load(response)
+        except Exception as e:
+            logger.warning(f"⚠ Ressources du master indisponibles ({self.ui_url}): {e}")
+            return None
+        workers = [{'cores': w.get('cores', 0), 'memory_mb': w.get('memory', 0)}
+                   for w in data.get('workers', []) if w.get('state') == 'ALIVE']
+        return {
+            'source': 'master',
+            'cores': sum(w['cores'] for w in workers) or data.get('cores', 0),
+            'workers': workers
+        }
+
+    def load_history(self) -> List[Dict]:
+        try:
+            with open(self.history_path, 'r') as f:
+                history = json.load(f)
+            return history if isinstance(history, list) else []
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Historique de réglage illisible ignoré ({self.history_path}): {e}")
+            return []
+
+    def record(self, **metrics):
+        """Ajouter les métriques d'un cycle réussi à l'historique (écriture atomique)"""
+        history = self.load_history()
+        history.append({'ts': round(time.time(), 3), **metrics})
+        history = history[-self.history_size:]
+        os.makedirs(os.path.dirname(self.history_path), exist_ok=True)
+        tmp_path = f"{self.history_path}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(history, f)
+            os.replace(tmp_path, self.history_path)
+        except OSError as e:
+            logger.warning(f"⚠ Historique de réglage non écrit: {e}")
+
+    # --- Décisions -----------------------------------------------------------
+
+    def _decide(self, key: str, value, reason: str):
+        self.decisions[key] = {'value': str(value), 'reason': reason}
+
+    def _executor_resources(self, workers: List[Dict]) -> Tuple[Optional[int], Optional[int]]:
+        """Cores et mémoire (MB) par executor, dimensionnés sur le plus petit worker"""
+        usable = [w for w in workers if w['cores'] > 0 and w['memory_mb'] > 0]
+        if not usable:
+            return None, None
+        smallest = min(usable, key=lambda w: (w['cores'], w['memory_mb']))
+        cores = min(smallest['cores'], MAX_EXECUTOR_CORES)
+        per_worker = smallest['cores'] // cores
+        memory_mb = int(smallest['memory_mb'] / per_worker * EXECUTOR_MEMORY_FRACTION)
+        if memory_mb < MIN_EXECUTOR_MEMORY_MB:
+            return cores, None
+        self._decide("spark.executor.cores", cores,
+                     f"plus petit worker: {smallest['cores']} cores, plafond {MAX_EXECUTOR_CORES}")
+        self._decide("spark.executor.memory", f"{memory_mb}m",
+                     f"{per_worker} executor(s) par worker de {smallest['memory_mb']} MB, "
+                     f"{EXECUTOR_MEMORY_FRACTION:.0%} de sa mémoire")
+        return cores, memory_mb
+
+    def tune(self) -> Dict[str, str]:
+        """Configuration à appliquer au builder: décisions puis valeurs épinglées"""
+        self.decisions = {}
+        if self.enabled:
+            self._tune()
+        for key, value in self.pins.items():
+            self.decisions[key] = {'value': value, 'reason': 'épinglé (TUNER_PINS)'}
+
+        for key, decision in self.decisions.items():
+            logger.info(f"🎛 {key}={decision['value']} ({decision['reason']})")
+        return {key: decision['value'] for key, decision in self.decisions.items()}
+
+    def _tune(self):
+        resources = self.cluster_resources()
+        if not resources or not resources['cores']:
+            logger.warning("⚠ Ressources du cluster inconnues, configuration par défaut conservée")
+            return
+        cores = resources['cores']
+
+        _, executor_memory_mb = self._executor_resources(resources['workers'])
+
+        # Volume d'entrée: médiane des derniers cycles, pour lisser un cycle atypique
+        volumes = sorted(h['input_bytes'] for h in self.load_history() if h.get('input_bytes'))
+        input_bytes = volumes[len(volumes) // 2] if volumes else None
+
+        # Taille cible: 64 MB au plus, mais assez petite pour occuper tous les cores
+        if input_bytes:
+            advisory = int(min(MAX_ADVISORY_BYTES, max(MIN_ADVISORY_BYTES, input_bytes / (cores * 2))))
+            self._decide("spark.sql.adaptive.advisoryPartitionSizeInBytes", advisory,
+                         f"~{input_bytes / MB:.1f} MB en entrée (médiane de {len(volumes)} cycles) "
+                         f"sur {cores} cores")
+        else:
+            advisory = MAX_ADVISORY_BYTES
+
+        # Partitions de shuffle: un multiple du nombre de cores, suffisant pour la taille cible;
+        # AQE fusionne ensuite les partitions trop petites
+        needed = math.ceil(input_bytes / advisory) if input_bytes else 0
+        partitions = max(cores * PARTITIONS_PER_CORE, math.ceil(needed / cores) * cores)
+        self._decide("spark.sql.shuffle.partitions", partitions,
+                     f"{cores} cores ({resources['source']})"
+                     + (f", {needed} partitions de {advisory / MB:.1f} MB" if needed else ", sans historique"))
+
+        # Seuil de broadcast proportionnel à la mémoire des executors
+        if executor_memory_mb:
+            broadcast = int(min(MAX_BROADCAST_BYTES,
+                                max(MIN_BROADCAST_BYTES, executor_memory_mb * MB * BROADCAST_MEMORY_FRACTION)))
+            self._decide("spark.sql.autoBroadcastJoinThreshold", broadcast,
+                         f"{BROADCAST_MEMORY_FRACTION:.0%} de {executor_memory_mb} MB par executor")
+
+    def describe(self) -> str:
+        if not self.enabled:
+            return f"désactivé, {len(self.pins)} valeur(s) épinglée(s)"
+        return f"actif ({self.ui_url or self.master_url}), {len(self.pins)} valeur(s) épinglée(s)"
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Consommation incrémentale des événements structurés émis par le job Spark
+Remplace l'analyse des mots-clés du log pour déterminer l'état de l'application
+"""
+
+import json
+import logging
+from datetime import datetime
+
+from log_tailer import LogTailer
+from prometheus import Registry
+
+logger = logging.getLogger(__name__)
+
+STAGE_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SESSION_BUCKETS = (0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+PROBE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 15)
+
+
+class JobEventConsumer(LogTailer):
+    """Lit le fichier JSONL d'événements par offset et alimente l'état et les métriques"""
+
+    def __init__(self, path: str, registry: Registry, max_events: int = 50):
+        super().__init__(path, max_lines=max_events)
+        self.app = {
+            'status': 'unknown',
+            'last_event': None,
+            'last_event_at': None,
+            'restart_count': 0,
+            'cycles_ok': 0,
+            'cycles_failed': 0,
+            'last_cycle_duration_s': None,
+            'last_session_startup_s': None
+        }
+
+        self.cycles = registry.counter('spark_job_cycles_total', 'Cycles terminés par statut', ['status'])
+        self.cycle_duration = registry.histogram('spark_job_cycle_duration_seconds', 'Durée des cycles',
+                                                 ['status'], STAGE_BUCKETS)
+        self.stage_duration = registry.histogram('spark_job_stage_duration_seconds', "Durée des étapes",
+                                                 ['stage', 'status'], STAGE_BUCKETS)
+        self.stage_rows = registry.counter('spark_job_stage_rows_total', "Lignes produites par étape", ['stage'])
+        self.last_stage_rows = registry.gauge('spark_job_stage_last_rows', "Lignes de la dernière exécution", ['stage'])
+        self.restarts = registry.counter('spark_job_restarts_total', 'Redémarrages par classe de panne', ['kind'])
+        self.backoff = registry.histogram('spark_job_backoff_seconds', 'Attente avant redémarrage', [],
+                                          (1, 2, 4, 8, 16, 32, 60))
+        self.session_startup = registry.histogram('spark_job_session_startup_seconds',
+                                                  'Durée de création de la session Spark', [], SESSION_BUCKETS)
+        self.session_teardown = registry.histogram('spark_job_session_teardown_seconds',
+                                                   "Durée d'arrêt de la session Spark", [], SESSION_BUCKETS)
+        self.session_failures = registry.counter('spark_job_session_failures_total',
+                                                 'Échecs de création de session')
+        self.probe_latency = registry.histogram('spark_job_health_probe_seconds', 'Latence de la sonde de santé',
+                                                ['tier'], PROBE_BUCKETS)
+        self.schedule_lag = registry.histogram('spark_job_cycle_schedule_lag_seconds',
+                                               "Retard du démarrage d'un cycle sur son échéance",
+                                               ['trigger'], STAGE_BUCKETS)
+        self.data_lag = registry.histogram('spark_job_cycle_data_lag_seconds',
+                                           "Âge des fichiers d'entrée au démarrage du cycle", [], STAGE_BUCKETS)
+        self.freshness = registry.histogram('spark_job_cycle_freshness_seconds',
+                                            "Âge des fichiers d'entrée à la fin du cycle", [], STAGE_BUCKETS)
+        self.skipped_ticks = registry.counter('spark_job_schedule_skipped_ticks_total',
+                                              'Échéances sautées en cadence fixe')
+        self.last_event_ts = registry.gauge('spark_job_last_event_timestamp_seconds',
+                                            'Horodatage du dernier événement')
+
+    def _consume(self, line: str):
+        if not line.strip():
+            return
+        try:
+            event = json.loads(line)
+            self.handle(event)
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f"Événement invalide ignoré: {e}")
+            return
+        self.lines.append(line)
+        self.counters['lines'] += 1
+
+    def handle(self, event: dict):
+        name = event['event']
+        ts = event.get('ts')
+        self.app['last_event'] = name
+        if ts is not None:
+            self.app['last_event_at'] = datetime.fromtimestamp(ts).isoformat()
+            self.last_event_ts.set(ts)
+
+        if name in ('job_start', 'cycle_start'):
+            self.app['status'] = 'running'
+            if event.get('schedule_lag_s') is not None:
+                self.schedule_lag.observe(max(event['schedule_lag_s'], 0), trigger=event.get('trigger', 'unknown'))
+            if event.get('data_lag_s') is not None:
+                self.data_lag.observe(event['data_lag_s'])
+            if event.get('skipped_ticks'):
+                self.skipped_ticks.inc(event['skipped_ticks'])
+        elif name == 'cycle_end':
+            status = event.get('status', 'ok')
+            duration = event.get('duration_s')
+            self.cycles.inc(status=status)
+            if duration is not None:
+                self.cycle_duration.observe(duration, status=status)
+            if event.get('freshness_s') is not None:
+                self.freshness.observe(event['freshness_s'])
+            if status == 'ok':
+                self.app['status'] = 'healthy'
+                self.app['cycles_ok'] += 1
+                self.app['last_cycle_duration_s'] = duration
+            else:
+                self.app['status'] = 'error'
+                self.app['cycles_failed'] += 1
+        elif name == 'stage':
+            stage = event['stage']
+            if event.get('duration_s') is not None:
+                self.stage_duration.observe(event['duration_s'], stage=stage, status=event.get('status', 'ok'))
+            if event.get('rows') is not None:
+                self.stage_rows.inc(event['rows'], stage=stage)
+                self.last_stage_rows.set(event['rows'], stage=stage)
+        elif name == 'restart':
+            self.app['restart_count'] += 1
+            self.app['status'] = 'error'
+            self.restarts.inc(kind=event.get('kind', 'unknown'))
+            if event.get('backoff_s') is not None:
+                self.backoff.observe(event['backoff_s'])
+        elif name == 'session_created':
+            self.session_startup.observe(event['duration_s'])
+            self.app['last_session_startup_s'] = event['duration_s']
+        elif name == 'session_stopped':
+            self.session_teardown.observe(event['duration_s'])
+        elif name == 'session_failed':
+            self.session_failures.inc()
+        elif name == 'health_probe':
+            if event.get('latency_ms') is not None:
+                self.probe_latency.observe(event['latency_ms'] / 1000, tier=event.get('tier') or 'unknown')
+        elif name == 'job_end':
+            self.app['status'] = 'stopped'
+
+    @property
+    def has_events(self) -> bool:
+        return self.app['last_event'] is not None
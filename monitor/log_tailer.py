@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Lecture incrémentale du log de l'application pour le monitor
+Seules les données ajoutées depuis le dernier passage sont lues
+"""
+
+import os
+from collections import deque
+from typing import List, Optional
+
+ERROR_KEYWORDS = ('ERROR', 'CRITICAL', 'FAILED', '✗', '💥')
+SUCCESS_KEYWORDS = ('SUCCESS', 'COMPLETED', '✓', '🚀')
+RESTART_KEYWORDS = ('Redémarrage',)
+
+HEAD_SIZE = 64
+
+
+class LogTailer:
+    """Suit un fichier de log par offset, en gérant troncature et rotation"""
+
+    def __init__(self, path: str, max_lines: int = 50, chunk_size: int = 1024 * 1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.lines = deque(maxlen=max_lines)
+        self.offset = 0
+        self.inode: Optional[int] = None
+        self.head = b''
+        self._partial = b''
+        self.counters = {
+            'restarts': 0,
+            'errors': 0,
+            'successes': 0,
+            'lines': 0,
+            'rotations': 0
+        }
+
+    def _reset(self):
+        """Repartir du début du fichier (nouveau fichier ou fichier tronqué)"""
+        if self.inode is not None:
+            self.counters['rotations'] += 1
+        self.offset = 0
+        self.head = b''
+        self._partial = b''
+
+    def _consume(self, line: str):
+        self.lines.append(line)
+        self.counters['lines'] += 1
+        if any(keyword in line for keyword in RESTART_KEYWORDS):
+            self.counters['restarts'] += 1
+        if any(keyword in line for keyword in ERROR_KEYWORDS):
+            self.counters['errors'] += 1
+        elif any(keyword in line for keyword in SUCCESS_KEYWORDS):
+            self.counters['successes'] += 1
+
+    def _read(self, f) -> int:
+        """Consommer les lignes complètes depuis l'offset courant jusqu'à la fin du fichier"""
+        new_lines = 0
+        f.seek(self.offset)
+        while True:
+            chunk = f.read(self.chunk_size)
+            if not chunk:
+                break
+            self.offset += len(chunk)
+
+            data = self._partial + chunk
+            *complete, self._partial = data.split(b'\n')
+            for raw in complete:
+                self._consume(raw.decode('utf-8', errors='replace').rstrip('\r'))
+                new_lines += 1
+        return new_lines
+
+    def _rotated_files(self) -> List[str]:
+        """Fichiers renommés par rotation depuis le dernier passage, du plus ancien au plus récent
+
+        Le premier est l'ancien fichier suivi (<path>.N de même inode), à relire depuis l'offset
+        """
+        newer = []
+        index = 1
+        while True:
+            path = f"{self.path}.{index}"
+            try:
+                inode = os.stat(path).st_ino
+            except FileNotFoundError:
+                # Ancien fichier supprimé entre deux passages: sa fin est perdue
+                return []
+            if inode == self.inode:
+                return [path] + newer[::-1]
+            newer.append(path)
+            index += 1
+
+    def _drain_rotated(self) -> int:
+        """Lire la fin non lue de l'ancien fichier, puis les rotations intermédiaires en entier"""
+        new_lines = 0
+        for position, path in enumerate(self._rotated_files()):
+            if position:
+                self.offset = 0
+            try:
+                with open(path, 'rb') as f:
+                    new_lines += self._read(f)
+            except FileNotFoundError:
+                continue
+            # Le fichier ne recevra plus d'écriture: sa dernière ligne est complète
+            if self._partial:
+                self._consume(self._partial.decode('utf-8', errors='replace').rstrip('\r'))
+                self._partial = b''
+                new_lines += 1
+        return new_lines
+
+    def poll(self) -> int:
+        """Lire les lignes ajoutées; retourne le nombre de nouvelles lignes"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+
+        new_lines = 0
+        with open(self.path, 'rb') as f:
+            # Un inode réutilisé se détecte par le début du fichier
+            head = f.read(HEAD_SIZE)
+            if (stat.st_ino != self.inode or stat.st_size < self.offset
+                    or head[:len(self.head)] != self.head):
+                if self.inode is not None and stat.st_ino != self.inode:
+                    # Rotation: ne pas perdre ce qui a été ajouté à l'ancien fichier
+                    new_lines += self._drain_rotated()
+                self._reset()
+                self.inode = stat.st_ino
+            if len(self.head) < HEAD_SIZE:
+                self.head = head
+
+            if stat.st_size == self.offset:
+                return new_lines
+
+            new_lines += self._read(f)
+
+        return new_lines
+
+    def recent(self, count: Optional[int] = None) -> List[str]:
+        """Dernières lignes lues (au plus la taille du buffer)"""
+        lines = [line.strip() for line in self.lines]
+        return lines if count is None else lines[-count:]
+
+    def status(self) -> str:
+        """Statut déduit des 10 dernières lignes"""
+        recent_text = ''.join(self.recent(10))
+        if any(keyword in recent_text for keyword in ERROR_KEYWORDS):
+            return 'error'
+        if any(keyword in recent_text for keyword in SUCCESS_KEYWORDS):
+            return 'healthy'
+        return 'running'
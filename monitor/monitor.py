@@ -7,108 +7,259 @@ import os
 import json
 import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
 from datetime import datetime
-from flask import Flask, render_template_string, jsonify
-from threading import Thread
+from flask import Flask, jsonify, request, Response
+from threading import Thread, Condition
+from collections import deque
+import copy
+import hashlib
 import logging
 
+from log_tailer import LogTailer
+from timeseries import TimeSeriesStore
+from job_events import JobEventConsumer
+from prometheus import Registry
+from results import ResultCache, UnsupportedFormat, query as query_results
+
 # Configuration logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+# Résultats exposés par /api/results/<nom>
+RESULT_DATASETS = {'category': 'category_analysis', 'customer': 'customer_analysis'}
+
 class SparkMonitor:
     def __init__(self):
         self.spark_master_url = os.getenv('SPARK_MASTER_URL', 'http://spark-master:8080')
-        self.spark_worker_url = os.getenv('SPARK_WORKER_URL', 'http://spark-worker:8081')
+        self.static_workers = {
+            url.strip().rstrip('/')
+            for url in os.getenv('SPARK_WORKER_URL', 'http://spark-worker:8081').split(',')
+            if url.strip()
+        }
+        self.discovered_workers = set()
+        self.discover_workers_enabled = os.getenv('MONITOR_DISCOVER_WORKERS', 'true').lower() == 'true'
+        self.connect_timeout = float(os.getenv('MONITOR_CONNECT_TIMEOUT', '2'))
+        self.endpoint_deadline = float(os.getenv('MONITOR_ENDPOINT_DEADLINE', '5'))
+        
+        # Pool de threads et connexions HTTP réutilisées entre les passages
+        pool_size = int(os.getenv('MONITOR_POLL_THREADS', '16'))
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='poll')
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+        
         self.status = {
             'master': {'status': 'unknown', 'last_check': None},
             'worker': {'status': 'unknown', 'last_check': None},
+            'workers': {},
             'app': {'status': 'unknown', 'last_check': None, 'restart_count': 0}
         }
         self.logs = []
+        self.log_tailer = LogTailer(os.getenv('APP_LOG_FILE', '/logs/spark_app.log'))
+        self.history = TimeSeriesStore(
+            os.getenv('MONITOR_HISTORY_FILE', '/data/monitor/metrics_history.jsonl') or None,
+            max_file_mb=int(os.getenv('MONITOR_HISTORY_MAX_MB', '50'))
+        )
+        self._last_restart_count = None
         
-    def check_spark_master(self):
-        """Vérifier l'état du Spark Master"""
-        try:
-            response = requests.get(f"{self.spark_master_url}/json", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                self.status['master'] = {
-                    'status': 'healthy',
-                    'last_check': datetime.now().isoformat(),
-                    'workers': len(data.get('workers', [])),
-                    'running_apps': len(data.get('activeapps', [])),
-                    'completed_apps': len(data.get('completedapps', []))
-                }
-                return True
-        except Exception as e:
-            logger.error(f"Erreur check master: {e}")
-            
+        # Tables de résultats parsées, relues seulement après un nouveau commit
+        self.results_dir = os.getenv('MONITOR_RESULTS_DIR', '/data/output')
+        self.results = ResultCache(
+            max_bytes=int(os.getenv('MONITOR_RESULTS_CACHE_MB', '256')) * 1024 * 1024,
+            mmap_threshold=int(os.getenv('MONITOR_RESULTS_MMAP_MB', '4')) * 1024 * 1024
+        )
+        
+        # Dernier état publié (dashboard, /api/status, /api/stream)
+        self.state_changed = Condition()
+        self.version = 0
+        self.snapshot = {'status': copy.deepcopy(self.status), 'logs': [], 'timestamp': datetime.now().isoformat()}
+        self.status_body = b''
+        self.etag = '"0"'
+        self.deltas = deque(maxlen=int(os.getenv('MONITOR_STREAM_BACKLOG', '100')))
+        self._published_state = None
+        self.publish()
+        
+        # Métriques Prometheus: événements du job et état du cluster
+        self.registry = Registry()
+        self.job_events = JobEventConsumer(os.getenv('JOB_EVENTS_FILE', '/logs/job_events.jsonl'), self.registry)
+        self.gauges = {
+            'master_up': self.registry.gauge('spark_master_up', 'Master joignable (1) ou non (0)'),
+            'running_apps': self.registry.gauge('spark_master_running_apps', 'Applications actives'),
+            'workers_alive': self.registry.gauge('spark_workers_alive', 'Workers sains'),
+            'workers_total': self.registry.gauge('spark_workers_total', 'Workers connus'),
+            'worker_up': self.registry.gauge('spark_worker_up', 'Worker joignable (1) ou non (0)', ['worker']),
+            'cores': self.registry.gauge('spark_worker_cores', 'Cores des workers sains'),
+            'cores_used': self.registry.gauge('spark_worker_cores_used', 'Cores utilisés'),
+            'memory_mb': self.registry.gauge('spark_worker_memory_mb', 'Mémoire des workers sains (MB)'),
+            'memory_used_mb': self.registry.gauge('spark_worker_memory_used_mb', 'Mémoire utilisée (MB)')
+        }
+        
+    def _get_json(self, url):
+        """GET {url}/json via la session HTTP partagée (connexions keep-alive)"""
+        response = self.http.get(f"{url}/json", timeout=(self.connect_timeout, self.endpoint_deadline))
+        response.raise_for_status()
+        return response.json()
+    
+    def check_spark_master(self, data=None, error=None):
+        """Mettre à jour l'état du Spark Master à partir de sa réponse /json"""
+        if data is not None:
+            self.status['master'] = {
+                'status': 'healthy',
+                'last_check': datetime.now().isoformat(),
+                'workers': len(data.get('workers', [])),
+                'running_apps': len(data.get('activeapps', [])),
+                'completed_apps': len(data.get('completedapps', []))
+            }
+            return True
+        
+        logger.error(f"Erreur check master: {error}")
         self.status['master'] = {
             'status': 'unhealthy',
             'last_check': datetime.now().isoformat()
         }
         return False
     
-    def check_spark_worker(self):
-        """Vérifier l'état du Spark Worker"""
-        try:
-            response = requests.get(f"{self.spark_worker_url}/json", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                self.status['worker'] = {
-                    'status': 'healthy',
-                    'last_check': datetime.now().isoformat(),
-                    'cores': data.get('cores', 0),
-                    'memory': data.get('memory', 0),
-                    'cores_used': data.get('coresused', 0),
-                    'memory_used': data.get('memoryused', 0)
-                }
-                return True
-        except Exception as e:
-            logger.error(f"Erreur check worker: {e}")
-            
-        self.status['worker'] = {
+    def check_spark_worker(self, url, data=None, error=None):
+        """Mettre à jour l'état d'un Spark Worker à partir de sa réponse /json"""
+        if data is not None:
+            self.status['workers'][url] = {
+                'status': 'healthy',
+                'last_check': datetime.now().isoformat(),
+                'cores': data.get('cores', 0),
+                'memory': data.get('memory', 0),
+                'cores_used': data.get('coresused', 0),
+                'memory_used': data.get('memoryused', 0)
+            }
+            return True
+        
+        logger.error(f"Erreur check worker {url}: {error}")
+        self.status['workers'][url] = {
             'status': 'unhealthy',
             'last_check': datetime.now().isoformat()
         }
         return False
     
-    def check_app_logs(self):
-        """Vérifier les logs de l'application"""
-        try:
-            log_file = '/logs/spark_app.log'
-            if os.path.exists(log_file):
-                with open(log_file, 'r') as f:
-                    lines = f.readlines()
-                    
-                # Garder seulement les 50 dernières lignes
-                recent_lines = lines[-50:]
-                self.logs = [line.strip() for line in recent_lines]
-                
-                # Analyser les logs pour déterminer le statut
-                error_keywords = ['ERROR', 'CRITICAL', 'FAILED', '✗', '💥']
-                success_keywords = ['SUCCESS', 'COMPLETED', '✓', '🚀']
-                
-                recent_text = ''.join(recent_lines[-10:])  # 10 dernières lignes
+    def worker_urls(self):
+        """Workers découverts via le master, sinon la liste statique SPARK_WORKER_URL"""
+        return self.discovered_workers or self.static_workers
+    
+    def discover_workers(self, master_data):
+        """Workers vivants annoncés par le master"""
+        return {
+            worker['webuiaddress'].rstrip('/')
+            for worker in master_data.get('workers', [])
+            if worker.get('webuiaddress') and worker.get('state', 'ALIVE') == 'ALIVE'
+        }
+    
+    def aggregate_workers(self):
+        """Synthèse de tous les workers pour la carte du dashboard"""
+        workers = list(self.status['workers'].values())
+        healthy = [w for w in workers if w['status'] == 'healthy']
+        
+        if not workers:
+            status = 'unknown'
+        elif len(healthy) == len(workers):
+            status = 'healthy'
+        elif healthy:
+            status = 'degraded'
+        else:
+            status = 'unhealthy'
+        
+        self.status['worker'] = {
+            'status': status,
+            'last_check': datetime.now().isoformat(),
+            'count': len(workers),
+            'healthy': len(healthy),
+            'cores': sum(w['cores'] for w in healthy),
+            'memory': sum(w['memory'] for w in healthy),
+            'cores_used': sum(w['cores_used'] for w in healthy),
+            'memory_used': sum(w['memory_used'] for w in healthy)
+        }
+    
+    def poll_cluster(self):
+        """Interroger master et workers en parallèle, chaque endpoint avec sa propre échéance"""
+        pending = {}
+        polled = set()
+        
+        def submit(kind, url):
+            polled.add(url)
+            future = self.executor.submit(self._get_json, url)
+            pending[future] = (kind, url, time.monotonic() + self.endpoint_deadline)
+        
+        submit('master', self.spark_master_url)
+        for url in self.worker_urls():
+            submit('worker', url)
+        
+        while pending:
+            next_deadline = min(deadline for _, _, deadline in pending.values())
+            done, _ = wait(pending, timeout=max(0.0, next_deadline - time.monotonic()),
+                           return_when=FIRST_COMPLETED)
+            
+            for future in done:
+                kind, url, _ = pending.pop(future)
+                try:
+                    data, error = future.result(), None
+                except Exception as e:
+                    data, error = None, e
                 
-                if any(keyword in recent_text for keyword in error_keywords):
-                    app_status = 'error'
-                elif any(keyword in recent_text for keyword in success_keywords):
-                    app_status = 'healthy'
+                if kind == 'master':
+                    if self.check_spark_master(data, error) and self.discover_workers_enabled:
+                        # Les workers découverts sont interrogés dans le même passage
+                        self.discovered_workers = self.discover_workers(data)
+                        for worker_url in self.discovered_workers - polled:
+                            submit('worker', worker_url)
                 else:
-                    app_status = 'running'
-                
-                # Compter les redémarrages
-                restart_count = sum(1 for line in recent_lines if 'Redémarrage' in line or '🔄' in line)
-                
+                    self.check_spark_worker(url, data, error)
+            
+            # Un endpoint bloqué ne retarde pas les autres au-delà de son échéance
+            now = time.monotonic()
+            for future, (kind, url, deadline) in list(pending.items()):
+                if deadline <= now:
+                    pending.pop(future)
+                    future.cancel()
+                    error = f"pas de réponse après {self.endpoint_deadline}s"
+                    if kind == 'master':
+                        self.check_spark_master(None, error)
+                    else:
+                        self.check_spark_worker(url, None, error)
+        
+        # Oublier les workers qui ne sont plus annoncés
+        known = self.worker_urls()
+        for url in list(self.status['workers']):
+            if url not in known:
+                del self.status['workers'][url]
+        
+        self.aggregate_workers()
+    
+    def check_app_logs(self):
+        """Vérifier l'état de l'application à partir de ses événements structurés"""
+        try:
+            # Lecture incrémentale: seules les lignes ajoutées sont lues
+            self.job_events.poll()
+            self.log_tailer.poll()
+            self.logs = self.log_tailer.recent()
+            
+            if self.job_events.has_events:
+                self.status['app'] = {
+                    **self.job_events.app,
+                    'last_check': datetime.now().isoformat(),
+                    'log_lines': self.log_tailer.counters['lines']
+                }
+            else:
+                # Repli pour un job qui n'émet pas encore d'événements
+                counters = self.log_tailer.counters
                 self.status['app'] = {
-                    'status': app_status,
+                    'status': self.log_tailer.status(),
                     'last_check': datetime.now().isoformat(),
-                    'restart_count': restart_count,
-                    'log_lines': len(self.logs)
+                    'restart_count': counters['restarts'],
+                    'error_count': counters['errors'],
+                    'success_count': counters['successes'],
+                    'log_lines': counters['lines']
                 }
                 
         except Exception as e:
@@ -118,13 +269,101 @@ class SparkMonitor:
                 'last_check': datetime.now().isoformat()
             }
     
+    def update_cluster_gauges(self):
+        """Reporter l'état du master et des workers dans les métriques Prometheus"""
+        master = self.status['master']
+        worker = self.status['worker']
+        self.gauges['master_up'].set(1 if master['status'] == 'healthy' else 0)
+        self.gauges['running_apps'].set(master.get('running_apps', 0))
+        self.gauges['workers_alive'].set(worker.get('healthy', 0))
+        self.gauges['workers_total'].set(worker.get('count', 0))
+        self.gauges['cores'].set(worker.get('cores', 0))
+        self.gauges['cores_used'].set(worker.get('cores_used', 0))
+        self.gauges['memory_mb'].set(worker.get('memory', 0))
+        self.gauges['memory_used_mb'].set(worker.get('memory_used', 0))
+        
+        self.gauges['worker_up'].values.clear()
+        for url, state in self.status['workers'].items():
+            self.gauges['worker_up'].set(1 if state['status'] == 'healthy' else 0, worker=url)
+    
+    def record_history(self):
+        """Ajouter un échantillon de l'état courant à l'historique"""
+        master = self.status['master']
+        worker = self.status['worker']
+        restart_count = self.status['app'].get('restart_count', 0)
+        
+        # Redémarrages survenus depuis l'échantillon précédent (somme = taux par pas)
+        restarts = 0 if self._last_restart_count is None else max(restart_count - self._last_restart_count, 0)
+        self._last_restart_count = restart_count
+        
+        self.history.record({
+            'master_up': 1 if master['status'] == 'healthy' else 0,
+            'workers_alive': worker.get('healthy', 0),
+            'running_apps': master.get('running_apps', 0),
+            'cores': worker.get('cores', 0),
+            'cores_used': worker.get('cores_used', 0),
+            'memory_mb': worker.get('memory', 0),
+            'memory_used_mb': worker.get('memory_used', 0),
+            'restarts': restarts,
+            'restart_total': restart_count
+        })
+    
+    @staticmethod
+    def _comparable(status):
+        """État sans les horodatages de vérification, pour détecter un vrai changement"""
+        if isinstance(status, dict):
+            return {k: SparkMonitor._comparable(v) for k, v in status.items() if k != 'last_check'}
+        return status
+    
+    def publish(self):
+        """Publier l'état courant s'il a changé: nouvelle version, ETag et delta"""
+        status = copy.deepcopy(self.status)
+        logs = list(self.logs)
+        state = {'status': self._comparable(status), 'logs': logs}
+        if state == self._published_state:
+            return False
+        
+        previous = self._published_state or {'status': {}, 'logs': None}
+        delta = {'status': {k: v for k, v in status.items()
+                            if state['status'].get(k) != previous['status'].get(k)}}
+        if logs != previous['logs']:
+            delta['logs'] = logs
+        
+        timestamp = datetime.now().isoformat()
+        body = json.dumps({'status': status, 'logs': logs[-10:], 'timestamp': timestamp},
+                          sort_keys=True).encode('utf-8')
+        
+        with self.state_changed:
+            self.version += 1
+            self.snapshot = {'status': status, 'logs': logs, 'timestamp': timestamp}
+            self.status_body = body
+            self.etag = f'"{self.version}-{hashlib.sha1(body).hexdigest()[:16]}"'
+            self.deltas.append((self.version, delta))
+            self._published_state = state
+            self.state_changed.notify_all()
+        return True
+    
+    def changes_since(self, version):
+        """Deltas depuis une version; None si le client est trop en retard ou en avance (snapshot complet)"""
+        with self.state_changed:
+            if version == self.version:
+                return []
+            # Version inconnue (monitor redémarré, compteur reparti de 1): resynchroniser le client
+            if version > self.version:
+                return None
+            if not self.deltas or self.deltas[0][0] > version + 1:
+                return None
+            return [(v, d) for v, d in self.deltas if v > version]
+    
     def monitor_loop(self):
         """Boucle de monitoring"""
         while True:
             try:
-                self.check_spark_master()
-                self.check_spark_worker()
+                self.poll_cluster()
+                self.update_cluster_gauges()
                 self.check_app_logs()
+                self.record_history()
+                self.publish()
                 time.sleep(10)  # Vérifier toutes les 10 secondes
             except Exception as e:
                 logger.error(f"Erreur monitoring: {e}")
@@ -133,10 +372,7 @@ class SparkMonitor:
 # Instance globale du monitor
 monitor = SparkMonitor()
 
-@app.route('/')
-def dashboard():
-    """Page principale du dashboard"""
-    html_template = """
+DASHBOARD_TEMPLATE = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -154,6 +390,10 @@ def dashboard():
             .status-unknown { border-left: 5px solid #f39c12; }
             .status-error { border-left: 5px solid #c0392b; }
             .status-running { border-left: 5px solid #3498db; }
+            .status-degraded { border-left: 5px solid #e67e22; }
+            .status-stopped { border-left: 5px solid #7f8c8d; }
+            .workers-table { width: 100%; border-collapse: collapse; font-size: 0.9em; }
+            .workers-table td, .workers-table th { padding: 6px; border-bottom: 1px solid #ecf0f1; text-align: left; }
             .logs { background: #2c3e50; color: #ecf0f1; padding: 20px; border-radius: 8px; font-family: monospace; font-size: 12px; height: 400px; overflow-y: auto; }
             .metric { margin: 10px 0; }
             .metric-label { font-weight: bold; color: #7f8c8d; }
@@ -161,6 +401,7 @@ def dashboard():
             .refresh-btn { background: #3498db; color: white; padding: 10px 20px; border: none; border-radius: 4px; cursor: pointer; }
             .refresh-btn:hover { background: #2980b9; }
             .timestamp { color: #7f8c8d; font-size: 0.9em; }
+            .live { font-size: 0.9em; margin-left: 10px; }
         </style>
     </head>
     <body>
@@ -169,68 +410,87 @@ def dashboard():
                 <h1>🚀 Spark Failover POC - Dashboard</h1>
                 <p>Monitoring en temps réel du cluster Spark et de l'application</p>
                 <button class="refresh-btn" onclick="location.reload()">🔄 Actualiser</button>
+                <span class="live" id="live-status">⏸ Connexion au flux...</span>
             </div>
             
             <div class="status-grid">
-                <div class="status-card status-{{ status.master.status }}">
+                <div class="status-card status-{{ status.master.status }}" id="card-master">
                     <h3>🎯 Spark Master</h3>
                     <div class="metric">
                         <div class="metric-label">Status</div>
-                        <div class="metric-value">{{ status.master.status.upper() }}</div>
+                        <div class="metric-value" data-field="master.status" data-upper>{{ status.master.status.upper() }}</div>
                     </div>
-                    {% if status.master.workers is defined %}
                     <div class="metric">
                         <div class="metric-label">Workers</div>
-                        <div class="metric-value">{{ status.master.workers }}</div>
+                        <div class="metric-value" data-field="master.workers">{{ status.master.workers | default('-') }}</div>
                     </div>
                     <div class="metric">
                         <div class="metric-label">Applications actives</div>
-                        <div class="metric-value">{{ status.master.running_apps }}</div>
+                        <div class="metric-value" data-field="master.running_apps">{{ status.master.running_apps | default('-') }}</div>
                     </div>
-                    {% endif %}
-                    <div class="timestamp">Dernière vérification: {{ status.master.last_check }}</div>
+                    <div class="timestamp">Dernière vérification: <span data-field="master.last_check">{{ status.master.last_check }}</span></div>
                 </div>
                 
-                <div class="status-card status-{{ status.worker.status }}">
-                    <h3>⚙️ Spark Worker</h3>
+                <div class="status-card status-{{ status.worker.status }}" id="card-worker">
+                    <h3>⚙️ Spark Workers</h3>
                     <div class="metric">
                         <div class="metric-label">Status</div>
-                        <div class="metric-value">{{ status.worker.status.upper() }}</div>
+                        <div class="metric-value" data-field="worker.status" data-upper>{{ status.worker.status.upper() }}</div>
+                    </div>
+                    <div class="metric">
+                        <div class="metric-label">Workers (sains/total)</div>
+                        <div class="metric-value"><span data-field="worker.healthy">{{ status.worker.healthy | default('-') }}</span>/<span data-field="worker.count">{{ status.worker.count | default('-') }}</span></div>
                     </div>
-                    {% if status.worker.cores is defined %}
                     <div class="metric">
                         <div class="metric-label">Cores (utilisés/total)</div>
-                        <div class="metric-value">{{ status.worker.cores_used }}/{{ status.worker.cores }}</div>
+                        <div class="metric-value"><span data-field="worker.cores_used">{{ status.worker.cores_used | default('-') }}</span>/<span data-field="worker.cores">{{ status.worker.cores | default('-') }}</span></div>
                     </div>
                     <div class="metric">
                         <div class="metric-label">Mémoire (utilisée/totale)</div>
-                        <div class="metric-value">{{ status.worker.memory_used }}MB/{{ status.worker.memory }}MB</div>
+                        <div class="metric-value"><span data-field="worker.memory_used">{{ status.worker.memory_used | default('-') }}</span>MB/<span data-field="worker.memory">{{ status.worker.memory | default('-') }}</span>MB</div>
                     </div>
-                    {% endif %}
-                    <div class="timestamp">Dernière vérification: {{ status.worker.last_check }}</div>
+                    <div class="timestamp">Dernière vérification: <span data-field="worker.last_check">{{ status.worker.last_check }}</span></div>
                 </div>
                 
-                <div class="status-card status-{{ status.app.status }}">
+                <div class="status-card status-{{ status.app.status }}" id="card-app">
                     <h3>📱 Application</h3>
                     <div class="metric">
                         <div class="metric-label">Status</div>
-                        <div class="metric-value">{{ status.app.status.upper() }}</div>
+                        <div class="metric-value" data-field="app.status" data-upper>{{ status.app.status.upper() }}</div>
                     </div>
                     <div class="metric">
                         <div class="metric-label">Redémarrages</div>
-                        <div class="metric-value">{{ status.app.restart_count }}</div>
+                        <div class="metric-value" data-field="app.restart_count">{{ status.app.restart_count }}</div>
                     </div>
                     <div class="metric">
                         <div class="metric-label">Lignes de log</div>
-                        <div class="metric-value">{{ status.app.log_lines }}</div>
+                        <div class="metric-value" data-field="app.log_lines">{{ status.app.log_lines | default('-') }}</div>
                     </div>
-                    <div class="timestamp">Dernière vérification: {{ status.app.last_check }}</div>
+                    <div class="timestamp">Dernière vérification: <span data-field="app.last_check">{{ status.app.last_check }}</span></div>
                 </div>
             </div>
             
+            <div class="status-card" id="card-workers" style="margin-bottom: 20px;{% if not status.workers %} display: none;{% endif %}">
+                <h3>🖥️ Détail des workers</h3>
+                <table class="workers-table">
+                    <thead><tr><th>Worker</th><th>Status</th><th>Cores</th><th>Mémoire</th><th>Dernière vérification</th></tr></thead>
+                    <tbody id="workers-body">
+                    {% for url, worker in status.workers.items() %}
+                    <tr>
+                        <td>{{ url }}</td>
+                        <td>{{ worker.status.upper() }}</td>
+                        <td>{% if worker.cores is defined %}{{ worker.cores_used }}/{{ worker.cores }}{% endif %}</td>
+                        <td>{% if worker.memory is defined %}{{ worker.memory_used }}MB/{{ worker.memory }}MB{% endif %}</td>
+                        <td class="timestamp">{{ worker.last_check }}</td>
+                    </tr>
+                    {% endfor %}
+                    </tbody>
+                </table>
+            </div>
+            
             <div class="status-card">
                 <h3>📋 Logs de l'application</h3>
-                <div class="logs">
+                <div class="logs" id="logs">
                     {% for log_line in logs %}
                     {{ log_line }}<br>
                     {% endfor %}
@@ -239,23 +499,200 @@ def dashboard():
         </div>
         
         <script>
-            // Auto-refresh toutes les 30 secondes
-            setTimeout(() => location.reload(), 30000);
+            // Mise à jour en place à partir des deltas poussés par /api/stream
+            const state = {{ {'status': status, 'logs': logs} | tojson }};
+            
+            function escapeHtml(text) {
+                const div = document.createElement('div');
+                div.textContent = text == null ? '' : String(text);
+                return div.innerHTML;
+            }
+            
+            function lookup(path) {
+                return path.split('.').reduce((obj, key) => (obj == null ? undefined : obj[key]), state.status);
+            }
+            
+            function render() {
+                document.querySelectorAll('[data-field]').forEach(el => {
+                    let value = lookup(el.dataset.field);
+                    if (value === undefined || value === null) value = '-';
+                    el.textContent = el.hasAttribute('data-upper') ? String(value).toUpperCase() : value;
+                });
+                ['master', 'worker', 'app'].forEach(name => {
+                    const section = state.status[name] || {};
+                    document.getElementById('card-' + name).className = 'status-card status-' + (section.status || 'unknown');
+                });
+                
+                const workers = state.status.workers || {};
+                document.getElementById('card-workers').style.display = Object.keys(workers).length ? '' : 'none';
+                document.getElementById('workers-body').innerHTML = Object.entries(workers).map(([url, w]) =>
+                    '<tr><td>' + escapeHtml(url) + '</td><td>' + escapeHtml(String(w.status).toUpperCase()) + '</td>' +
+                    '<td>' + (w.cores !== undefined ? escapeHtml(w.cores_used + '/' + w.cores) : '') + '</td>' +
+                    '<td>' + (w.memory !== undefined ? escapeHtml(w.memory_used + 'MB/' + w.memory + 'MB') : '') + '</td>' +
+                    '<td class="timestamp">' + escapeHtml(w.last_check) + '</td></tr>'
+                ).join('');
+                
+                const logs = document.getElementById('logs');
+                logs.innerHTML = (state.logs || []).map(escapeHtml).join('<br>');
+            }
+            
+            const live = document.getElementById('live-status');
+            if (window.EventSource) {
+                const source = new EventSource('/api/stream');
+                source.addEventListener('snapshot', e => {
+                    const data = JSON.parse(e.data);
+                    state.status = data.status;
+                    state.logs = data.logs;
+                    render();
+                });
+                source.addEventListener('delta', e => {
+                    const data = JSON.parse(e.data);
+                    Object.assign(state.status, data.status || {});
+                    if (data.logs) state.logs = data.logs;
+                    render();
+                });
+                source.onopen = () => { live.textContent = '🟢 Temps réel'; };
+                source.onerror = () => { live.textContent = '🟠 Reconnexion...'; };
+            } else {
+                // Navigateur sans SSE: rechargement périodique
+                setTimeout(() => location.reload(), 30000);
+            }
         </script>
     </body>
     </html>
     """
-    
-    return render_template_string(html_template, status=monitor.status, logs=monitor.logs)
+
+# Template compilé une seule fois au chargement du module
+dashboard_template = app.jinja_env.from_string(DASHBOARD_TEMPLATE)
+
+@app.route('/')
+def dashboard():
+    """Page principale du dashboard"""
+    snapshot = monitor.snapshot
+    return dashboard_template.render(status=snapshot['status'], logs=snapshot['logs'])
 
 @app.route('/api/status')
 def api_status():
-    """API pour récupérer le statut en JSON"""
-    return jsonify({
-        'status': monitor.status,
-        'logs': monitor.logs[-10:],  # 10 dernières lignes
-        'timestamp': datetime.now().isoformat()
-    })
+    """API pour récupérer le statut en JSON (corps pré-sérialisé, ETag / If-None-Match)"""
+    with monitor.state_changed:
+        body, etag = monitor.status_body, monitor.etag
+    
+    if etag in request.headers.get('If-None-Match', ''):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/stream')
+def api_stream():
+    """Flux Server-Sent Events: snapshot initial, puis deltas à chaque changement d'état"""
+    last_event_id = request.headers.get('Last-Event-ID')
+    heartbeat = float(os.getenv('MONITOR_STREAM_HEARTBEAT', '15'))
+    
+    def sse(event, version, data):
+        return f"event: {event}\nid: {version}\ndata: {json.dumps(data)}\n\n"
+    
+    def stream():
+        version = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+        changes = None if version is None else monitor.changes_since(version)
+        if changes is None:
+            with monitor.state_changed:
+                version, snapshot = monitor.version, monitor.snapshot
+            yield sse('snapshot', version, snapshot)
+        
+        while True:
+            timed_out = False
+            with monitor.state_changed:
+                if monitor.version == version:
+                    timed_out = not monitor.state_changed.wait(timeout=heartbeat)
+            if timed_out:
+                # Commentaire SSE pour garder la connexion ouverte
+                yield ": keep-alive\n\n"
+                continue
+            
+            changes = monitor.changes_since(version)
+            if changes is None:
+                with monitor.state_changed:
+                    version, snapshot = monitor.version, monitor.snapshot
+                yield sse('snapshot', version, snapshot)
+                continue
+            for version, delta in changes:
+                yield sse('delta', version, delta)
+    
+    response = Response(stream(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/api/metrics')
+def api_metrics():
+    """Historique d'une métrique: /api/metrics?metric=...&since=...&step=...&agg=..."""
+    metric = request.args.get('metric')
+    if not metric:
+        return jsonify({'metrics': monitor.history.metrics()})
+    
+    try:
+        # since: timestamp epoch, ou valeur négative relative à maintenant (ex. -3600)
+        since = float(request.args.get('since', -3600))
+        if since < 0:
+            since += time.time()
+        step = request.args.get('step')
+        step = float(step) if step else None
+        if step is not None and step <= 0:
+            raise ValueError("step doit être > 0")
+        return jsonify(monitor.history.query(metric, since, step, request.args.get('agg', 'avg')))
+    except KeyError:
+        return jsonify({'error': f"Métrique inconnue: {metric}"}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/results')
+def api_results_index():
+    """Résultats disponibles et état du cache"""
+    return jsonify({'datasets': sorted(RESULT_DATASETS), 'cache': monitor.results.describe()})
+
+@app.route('/api/results/<dataset>')
+def api_results(dataset):
+    """Résultats d'analyse: ?<col>=...&<col>_min=...&<col>_max=...&sort=...&order=...&page=...&page_size=..."""
+    if dataset not in RESULT_DATASETS:
+        return jsonify({'error': f"Résultat inconnu: {dataset}"}), 404
+    
+    args = request.args.to_dict()
+    try:
+        page = int(args.pop('page', 1))
+        page_size = min(int(args.pop('page_size', 50)), 1000)
+        sort = args.pop('sort', None)
+        order = args.pop('order', 'desc')
+        table = monitor.results.get(os.path.join(monitor.results_dir, RESULT_DATASETS[dataset]))
+        
+        # Même version et même requête: réponse inchangée
+        etag = '"' + hashlib.sha1(repr((table.signature, sorted(request.args.items()))).encode()).hexdigest()[:16] + '"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = Response(status=304)
+        else:
+            result = query_results(table, args, sort if sort is not None else
+                                   ('total_orders' if 'total_orders' in table.columns else None),
+                                   order, page, page_size)
+            result['dataset'] = dataset
+            result['version'] = {k: table.meta.get(k) for k in ('version', 'fingerprint', 'committed_at', 'format')}
+            response = jsonify(result)
+    except FileNotFoundError:
+        return jsonify({'error': f"Aucun résultat {dataset} pour le moment"}), 404
+    except UnsupportedFormat as e:
+        return jsonify({'error': str(e)}), 501
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Métriques au format texte Prometheus"""
+    return Response(monitor.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/health')
 def health():
@@ -271,4 +708,4 @@ def start_monitoring():
 if __name__ == '__main__':
     logger.info("🚀 Démarrage du monitor Spark")
     start_monitoring()
-    app.run(host='0.0.0.0', port=3000, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=3000, debug=False, threaded=True)
\ No newline at end of file
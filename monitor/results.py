@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Lecture des résultats d'analyse (/data/output) pour l'API du monitor
+Tables parsées gardées en cache LRU, invalidées par le pointeur de commit ou le mtime du répertoire
+"""
+
+import io
+import os
+import csv
+import sys
+import gzip
+import mmap
+import json
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import pyarrow.orc as orc
+    import pyarrow.parquet as pq
+except ImportError:
+    orc = pq = None
+
+POINTER_NAME = "_current"
+
+
+class UnsupportedFormat(Exception):
+    """Format de résultat illisible par le monitor"""
+
+
+def _convert(value: str):
+    """Typage des valeurs CSV: entier, flottant, sinon chaîne (vide -> None)"""
+    if value == '':
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+def _data_files(directory: str) -> List[str]:
+    """Fichiers de données d'un répertoire Spark (hors _SUCCESS, .crc, _temporary)"""
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith(('_', '.')))
+        files.extend(os.path.join(root, n) for n in sorted(names) if not n.startswith(('_', '.')))
+    return files
+
+
+class ResultTable:
+    """Table de résultats en mémoire, avec les ordres de tri déjà calculés"""
+
+    def __init__(self, columns: List[str], rows: List[tuple], nbytes: int, meta: Dict, signature: tuple = ()):
+        self.columns = columns
+        self.signature = signature
+        self.rows = rows
+        self.nbytes = nbytes
+        self.meta = meta
+        self._orders: Dict[Tuple[str, bool], List[tuple]] = {}
+        self._lock = threading.Lock()
+
+    def sorted_rows(self, column: Optional[str], descending: bool) -> List[tuple]:
+        if column is None:
+            return self.rows
+        key = (column, descending)
+        with self._lock:
+            if key not in self._orders:
+                index = self.columns.index(column)
+                present = [r for r in self.rows if r[index] is not None]
+                missing = [r for r in self.rows if r[index] is None]
+                # Les valeurs absentes sont toujours en fin de liste
+                self._orders[key] = sorted(present, key=lambda r: r[index], reverse=descending) + missing
+            return self._orders[key]
+
+
+class ResultCache:
+    """Cache LRU borné en octets des tables de résultats"""
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, mmap_threshold: int = 4 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.entries: 'OrderedDict[str, Tuple[tuple, ResultTable]]' = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'mmap_reads': 0}
+
+    # --- Validité -----------------------------------------------------------
+
+    def signature(self, root: str) -> tuple:
+        """Signature de la version lisible et répertoire à lire; un simple stat en cas de pointeur"""
+        pointer = os.path.join(root, POINTER_NAME)
+        try:
+            # Le pointeur est remplacé atomiquement: nouvel inode à chaque commit
+            st = os.stat(pointer)
+            return ('pointer', st.st_ino, st.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        # Résultat écrit en place (sans commit versionné): mtime du répertoire et des fichiers
+        st = os.stat(root)
+        files = tuple((f, os.path.getsize(f), os.stat(f).st_mtime_ns) for f in _data_files(root))
+        return ('mtime', st.st_mtime_ns, files)
+
+    # --- Lecture --------------------------------------------------------------
+
+    def _read_pointer(self, root: str) -> Tuple[str, Dict]:
+        with open(os.path.join(root, POINTER_NAME), 'r') as f:
+            pointer = json.load(f)
+        return os.path.join(root, pointer['path']), pointer
+
+    def _lines(self, path: str):
+        """Lignes d'un CSV; les gros fichiers sont lus par mmap, sans copie intégrale en mémoire"""
+        if path.endswith('.gz'):
+            with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+                yield from f
+            return
+        size = os.path.getsize(path)
+        if size == 0:
+            return
+        with open(path, 'rb') as f:
+            if size < self.mmap_threshold:
+                yield from io.TextIOWrapper(f, encoding='utf-8', newline='')
+                return
+            self.stats['mmap_reads'] += 1
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b''):
+                    yield line.decode('utf-8')
+
+    def _load_csv(self, files: List[str]) -> Tuple[List[str], List[tuple], int]:
+        columns: List[str] = []
+        rows: List[tuple] = []
+        nbytes = 0
+        for path in files:
+            reader = csv.reader(self._lines(path))
+            header = next(reader, None)
+            if header is None:
+                continue
+            columns = columns or header
+            for values in reader:
+                row = tuple(_convert(v) for v in values)
+                rows.append(row)
+                nbytes += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+        return columns, rows, nbytes
+
+    def _load_arrow(self, files: List[str], fmt: str) -> Tuple[List[str], List[tuple], int]:
+        if pq is None:
+            raise UnsupportedFormat(f"Lecture {fmt} indisponible: pyarrow n'est pas installé")
+        columns: List[str] = []
+        rows: List[tuple] = []
+        nbytes = 0
+        for path in files:
+            if fmt == 'parquet':
+                table = pq.read_table(path, memory_map=os.path.getsize(path) >= self.mmap_threshold)
+            else:
+                table = orc.ORCFile(path).read()
+            columns = columns or table.column_names
+            # La table Arrow est libérée: seule la taille des tuples Python conservés compte
+            for row in zip(*(table.column(c).to_pylist() for c in columns)):
+                rows.append(row)
+                nbytes += sys.getsizeof(row) + sum(sys.getsizeof(v) for v in row)
+        return columns, rows, nbytes
+
+    def _load(self, root: str, signature: tuple) -> ResultTable:
+        if signature[0] == 'pointer':
+            directory, meta = self._read_pointer(root)
+        else:
+            directory, meta = root, {}
+        files = _data_files(directory)
+        fmt = meta.get('format')
+        if fmt is None:
+            names = ' '.join(files)
+            fmt = 'parquet' if '.parquet' in names else 'orc' if '.orc' in names else 'csv'
+
+        if fmt == 'csv':
+            columns, rows, nbytes = self._load_csv(files)
+        else:
+            columns, rows, nbytes = self._load_arrow(files, fmt)
+        return ResultTable(columns, rows, nbytes, {**meta, 'format': fmt, 'files': len(files)}, signature)
+
+    def get(self, root: str) -> ResultTable:
+        """Table à jour: lue sur disque seulement si la version a changé"""
+        signature = self.signature(root)
+        with self.lock:
+            entry = self.entries.get(root)
+            if entry is not None and entry[0] == signature:
+                self.entries.move_to_end(root)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        # Lecture hors verrou: les autres tables restent servies pendant le chargement
+        table = self._load(root, signature)
+
+        with self.lock:
+            previous = self.entries.pop(root, None)
+            if previous is not None:
+                self.bytes -= previous[1].nbytes
+            self.entries[root] = (signature, table)
+            self.bytes += table.nbytes
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                self.stats['evictions'] += 1
+        return table
+
+    def describe(self) -> Dict:
+        with self.lock:
+            return {**self.stats, 'entries': len(self.entries), 'bytes': self.bytes, 'max_bytes': self.max_bytes}
+
+
+def query(table: ResultTable, filters: Dict[str, str], sort: Optional[str], order: str,
+          page: int, page_size: int) -> Dict:
+    """Filtrer (égalité, <col>_min, <col>_max), trier et paginer une table"""
+    if sort is not None and sort not in table.columns:
+        raise ValueError(f"Colonne de tri inconnue: {sort}")
+    if order not in ('asc', 'desc'):
+        raise ValueError("order doit valoir asc ou desc")
+    if page < 1 or page_size < 1:
+        raise ValueError("page et page_size doivent être >= 1")
+
+    predicates = []
+    for name, raw in filters.items():
+        column, op = name, 'eq'
+        if name.endswith(('_min', '_max')) and name[:-4] in table.columns:
+            column, op = name[:-4], name[-3:]
+        if column not in table.columns:
+            raise ValueError(f"Filtre inconnu: {name}")
+        predicates.append((table.columns.index(column), op, _convert(raw)))
+
+    def keep(row) -> bool:
+        for index, op, value in predicates:
+            cell = row[index]
+            try:
+                if op == 'eq' and cell != value \
+                        or op == 'min' and (cell is None or cell < value) \
+                        or op == 'max' and (cell is None or cell > value):
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    rows = table.sorted_rows(sort, order == 'desc')
+    if predicates:
+        rows = [r for r in rows if keep(r)]
+    start = (page - 1) * page_size
+    return {
+        'total': len(rows),
+        'page': page,
+        'page_size': page_size,
+        'pages': (len(rows) + page_size - 1) // page_size,
+        'columns': table.columns,
+        'rows': [dict(zip(table.columns, r)) for r in rows[start:start + page_size]]
+    }
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Historique compact des métriques du monitor
+Buffers circulaires typés par métrique, avec paliers de sous-échantillonnage et persistance
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# (nom, largeur du bucket en secondes, capacité)
+DEFAULT_TIERS = (
+    ('raw', 0, 8640),      # ~24 h à 10 s
+    ('1m', 60, 1440),      # 24 h
+    ('10m', 600, 1008),    # 7 jours
+)
+
+AGGREGATIONS = ('avg', 'min', 'max', 'sum', 'last')
+
+
+class RingBuffer:
+    """Buffer circulaire de taille fixe; chaque champ est un array('d') préalloué"""
+
+    def __init__(self, capacity: int, fields=('ts', 'value')):
+        self.capacity = capacity
+        self.fields = fields
+        self.columns = {name: array('d', bytes(8 * capacity)) for name in fields}
+        self.start = 0
+        self.size = 0
+
+    def append(self, *values: float):
+        index = (self.start + self.size) % self.capacity
+        for name, value in zip(self.fields, values):
+            self.columns[name][index] = value
+        if self.size < self.capacity:
+            self.size += 1
+        else:
+            self.start = (self.start + 1) % self.capacity
+
+    def oldest(self) -> Optional[float]:
+        return self.columns['ts'][self.start] if self.size else None
+
+    def rows(self, since: float = 0.0):
+        """Lignes (dans l'ordre chronologique) dont le timestamp est >= since"""
+        ts = self.columns['ts']
+        for offset in range(self.size):
+            index = (self.start + offset) % self.capacity
+            if ts[index] >= since:
+                yield tuple(self.columns[name][index] for name in self.fields)
+
+
+class MetricSeries:
+    """Une métrique: échantillons bruts et paliers agrégés (moyenne, min, max, effectif)"""
+
+    def __init__(self, tiers=DEFAULT_TIERS):
+        self.tiers = []
+        for name, width, capacity in tiers:
+            fields = ('ts', 'value') if width == 0 else ('ts', 'avg', 'min', 'max', 'count')
+            self.tiers.append({'name': name, 'width': width, 'ring': RingBuffer(capacity, fields),
+                               'bucket': None})
+
+    def add(self, ts: float, value: float):
+        for tier in self.tiers:
+            if tier['width'] == 0:
+                tier['ring'].append(ts, value)
+                continue
+
+            bucket_start = ts - ts % tier['width']
+            pending = tier['bucket']
+            if pending is not None and pending['start'] != bucket_start:
+                self._flush(tier)
+                pending = None
+            if pending is None:
+                tier['bucket'] = {'start': bucket_start, 'sum': 0.0, 'count': 0,
+                                  'min': value, 'max': value}
+                pending = tier['bucket']
+            pending['sum'] += value
+            pending['count'] += 1
+            pending['min'] = min(pending['min'], value)
+            pending['max'] = max(pending['max'], value)
+
+    def _flush(self, tier):
+        bucket = tier['bucket']
+        tier['ring'].append(bucket['start'], bucket['sum'] / bucket['count'],
+                            bucket['min'], bucket['max'], bucket['count'])
+        tier['bucket'] = None
+
+    def restore(self, tier_name: str, ts: float, avg: float, low: float, high: float, count: float):
+        """Réinjecter un bucket agrégé persisté (antérieur aux échantillons bruts)"""
+        for tier in self.tiers:
+            if tier['name'] == tier_name and tier['width']:
+                tier['ring'].append(ts, avg, low, high, count)
+                return
+
+    def archived_buckets(self):
+        """Buckets agrégés antérieurs au plus ancien échantillon brut: non reconstructibles au rechargement"""
+        oldest = self.tiers[0]['ring'].oldest()
+        for tier in self.tiers[1:]:
+            # Le bucket contenant le plus ancien échantillon brut est reconstruit à partir de celui-ci
+            cutoff = oldest - oldest % tier['width'] if oldest is not None else float('inf')
+            for row in tier['ring'].rows():
+                if row[0] < cutoff:
+                    yield tier['name'], row
+
+    def select_tier(self, since: float, step: float):
+        """Palier le plus fin compatible avec le pas demandé et couvrant la période"""
+        candidates = [t for t in self.tiers if t['width'] <= step] or self.tiers[:1]
+        for tier in candidates:
+            oldest = tier['ring'].oldest()
+            if oldest is not None and oldest <= since:
+                return tier
+        # Aucun palier ne couvre toute la période: le plus long historique disponible
+        return max(candidates, key=lambda t: t['width'])
+
+    def points(self, tier, since: float):
+        """Points (ts, avg, min, max, sum, count) du palier, bucket en cours inclus"""
+        for row in tier['ring'].rows(since):
+            if tier['width'] == 0:
+                ts, value = row
+                yield ts, value, value, value, value, 1
+            else:
+                ts, avg, low, high, count = row
+                yield ts, avg, low, high, avg * count, int(count)
+
+        bucket = tier['bucket']
+        if bucket is not None and bucket['start'] >= since:
+            yield (bucket['start'], bucket['sum'] / bucket['count'], bucket['min'],
+                   bucket['max'], bucket['sum'], bucket['count'])
+
+
+class TimeSeriesStore:
+    """Historique en mémoire de toutes les métriques, persisté en append-only (JSONL)"""
+
+    def __init__(self, path: Optional[str] = None, max_file_mb: int = 50, tiers=DEFAULT_TIERS):
+        self.path = path
+        self.max_file_bytes = max_file_mb * 1024 * 1024
+        self.tiers = tiers
+        self.series: Dict[str, MetricSeries] = {}
+        self.lock = threading.Lock()
+        if self.path:
+            self._load()
+
+    def _add(self, ts: float, metrics: Dict[str, float]):
+        for name, value in metrics.items():
+            if name not in self.series:
+                self.series[name] = MetricSeries(self.tiers)
+            self.series[name].add(ts, float(value))
+
+    def _load(self):
+        """Rejouer l'historique persisté au démarrage"""
+        try:
+            with open(self.path, 'r') as f:
+                for line in f:
+                    try:
+                        sample = json.loads(line)
+                        if 'tier' in sample:
+                            self._restore(sample)
+                        else:
+                            self._add(sample['ts'], sample['m'])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            logger.info(f"Historique rechargé: {len(self.series)} métriques depuis {self.path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.error(f"Historique illisible, persistance désactivée: {e}")
+            self.path = None
+
+    def _restore(self, record: Dict):
+        for name, bucket in record['b'].items():
+            if name not in self.series:
+                self.series[name] = MetricSeries(self.tiers)
+            self.series[name].restore(record['tier'], record['ts'], *bucket)
+
+    def _persist(self, ts: float, metrics: Dict[str, float]):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps({'ts': ts, 'm': metrics}, separators=(',', ':')) + '\n')
+            if os.path.getsize(self.path) > self.max_file_bytes:
+                self._compact()
+        except OSError as e:
+            logger.error(f"Erreur persistance historique, désactivée: {e}")
+            self.path = None
+
+    def _compact(self):
+        """Réécrire le fichier avec les échantillons bruts en mémoire, précédés des buckets agrégés plus anciens
+
+        Sans ces buckets, un redémarrage après compaction ne retrouverait que l'historique brut (~24 h)
+        """
+        buckets: Dict[tuple, Dict[str, list]] = {}
+        samples: Dict[float, Dict[str, float]] = {}
+        for name, series in self.series.items():
+            for tier_name, (ts, avg, low, high, count) in series.archived_buckets():
+                buckets.setdefault((ts, tier_name), {})[name] = [avg, low, high, count]
+            for ts, value in series.tiers[0]['ring'].rows():
+                samples.setdefault(ts, {})[name] = value
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w') as f:
+            for (ts, tier_name) in sorted(buckets):
+                f.write(json.dumps({'ts': ts, 'tier': tier_name, 'b': buckets[(ts, tier_name)]},
+                                   separators=(',', ':')) + '\n')
+            for ts in sorted(samples):
+                f.write(json.dumps({'ts': ts, 'm': samples[ts]}, separators=(',', ':')) + '\n')
+        os.replace(tmp_path, self.path)
+
+    def record(self, metrics: Dict[str, float], ts: Optional[float] = None):
+        """Enregistrer un échantillon de plusieurs métriques"""
+        ts = time.time() if ts is None else ts
+        metrics = {k: v for k, v in metrics.items() if isinstance(v, (int, float))}
+        with self.lock:
+            self._add(ts, metrics)
+            if self.path:
+                self._persist(ts, metrics)
+
+    def metrics(self) -> List[str]:
+        with self.lock:
+            return sorted(self.series)
+
+    def query(self, metric: str, since: float, step: Optional[float] = None,
+              agg: str = 'avg') -> Dict:
+        """Série agrégée côté serveur par pas de step secondes"""
+        if agg not in AGGREGATIONS:
+            raise ValueError(f"Agrégation inconnue: {agg} (attendu: {', '.join(AGGREGATIONS)})")
+
+        with self.lock:
+            series = self.series.get(metric)
+            if series is None:
+                raise KeyError(metric)
+
+            tier = series.select_tier(since, step or 0)
+            step = step or tier['width'] or None
+
+            buckets = {}
+            for ts, avg, low, high, total, count in series.points(tier, since):
+                key = ts - ts % step if step else ts
+                b = buckets.get(key)
+                if b is None:
+                    buckets[key] = [avg, low, high, total, count]
+                    continue
+                b[1] = min(b[1], low)
+                b[2] = max(b[2], high)
+                b[3] += total
+                b[4] += count
+                b[0] = avg
+
+        points = []
+        for key in sorted(buckets):
+            last, low, high, total, count = buckets[key]
+            value = {'avg': total / count if count else 0.0, 'min': low, 'max': high,
+                     'sum': total, 'last': last}[agg]
+            points.append([key, round(value, 6)])
+
+        return {'metric': metric, 'tier': tier['name'], 'step': step, 'agg': agg,
+                'since': since, 'points': points}